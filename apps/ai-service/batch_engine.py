@@ -0,0 +1,342 @@
+import warnings
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from engines import SEASON_LENGTH, interval_z
+from lambda_function import DemandForecaster, ForecastRequest, ForecastResult
+
+VECTORIZED_ENGINE = 'vectorized_ls'
+
+MIN_POINTS = 7
+HOLDOUT_FRACTION = 0.2
+RIDGE = 1e-3  # Keeps rows with missing weekdays solvable
+
+# Profile detection for every batch path (same label vocabulary as DemandForecaster.detect_trend_and_seasonality)
+TREND_THRESHOLD = 0.1  # Change of the 7-day mean over five days
+SEASONAL_MIN_POINTS = 28
+SEASONAL_STRENGTH_LEVELS = ((0.6, 'high'), (0.4, 'medium'), (0.2, 'low'))
+
+
+@dataclass
+class HistoryMatrix:
+    """
+    Daily histories for many products aligned on one date grid. Days missing
+    inside a product's first-to-last span hold zero demand (as in prepare_data);
+    NaN marks days outside the span.
+    """
+    product_ids: List[str]
+    dates: np.ndarray  # datetime64[D], shape (T,)
+    values: np.ndarray  # float64, shape (P, T)
+
+    @property
+    def observed(self) -> np.ndarray:
+        return ~np.isnan(self.values)
+
+
+@dataclass
+class BatchFit:
+    """Per-row outputs of one vectorized fit"""
+    product_ids: List[str]
+    future_dates: np.ndarray  # (H,)
+    yhat: np.ndarray  # (P, H)
+    yhat_lower: np.ndarray
+    yhat_upper: np.ndarray
+    accuracy: np.ndarray  # (P,)
+    trend: List[str]
+    seasonality: List[str]
+    history_length: np.ndarray  # (P,)
+
+
+def stack_histories(histories: Dict[str, List[Dict[str, Any]]]) -> HistoryMatrix:
+    """
+    Stack per-product history records ({'date': 'YYYY-MM-DD', 'demand': n})
+    into a (products x days) matrix. Duplicate dates are summed; missing days
+    inside each product's span are zero demand.
+    """
+    product_ids = list(histories)
+    rows, dates, values = [], [], []
+
+    for row, product_id in enumerate(product_ids):
+        records = histories[product_id]
+        rows.append(np.full(len(records), row, dtype=np.int64))
+        dates.extend(record['date'] for record in records)
+        values.extend(float(record.get('demand') or 0) for record in records)
+
+    if not dates:
+        return HistoryMatrix(product_ids, np.array([], dtype='datetime64[D]'), np.empty((len(product_ids), 0)))
+
+    dates = np.array(dates, dtype='datetime64[D]')
+    start, end = dates.min(), dates.max()
+    grid_length = int((end - start).astype(np.int64)) + 1
+
+    row_index = np.concatenate(rows)
+    col_index = (dates - start).astype(np.int64)
+
+    matrix = np.zeros((len(product_ids), grid_length))
+    np.add.at(matrix, (row_index, col_index), np.asarray(values))
+
+    first = np.full(len(product_ids), grid_length, dtype=np.int64)
+    last = np.full(len(product_ids), -1, dtype=np.int64)
+    np.minimum.at(first, row_index, col_index)
+    np.maximum.at(last, row_index, col_index)
+
+    columns = np.arange(grid_length)[None, :]
+    matrix[(columns < first[:, None]) | (columns > last[:, None])] = np.nan
+
+    return HistoryMatrix(product_ids, start + np.arange(grid_length), matrix)
+
+
+def design_matrix(dates: np.ndarray, origin: np.datetime64, scale: float) -> np.ndarray:
+    """Intercept, linear trend and six weekday dummies (Monday is the baseline)"""
+    days = (dates - origin).astype(np.int64)
+    weekday = (dates.astype('datetime64[D]').astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    dummies = (weekday[:, None] == np.arange(1, 7)[None, :]).astype(float)
+    return np.column_stack([np.ones(len(days)), days / scale, dummies])
+
+
+def _weighted_solve(X: np.ndarray, Y: np.ndarray, W: np.ndarray) -> tuple:
+    """
+    Solve one weighted least-squares problem per row of Y in a single batch.
+    X: (T, k) shared design, Y: (P, T) with NaNs zeroed, W: (P, T) 0/1 weights.
+    Returns coefficients (P, k) and the regularized normal matrices (P, k, k).
+    """
+    k = X.shape[1]
+    outer = (X[:, :, None] * X[:, None, :]).reshape(len(X), k * k)
+    XtWX = (W @ outer).reshape(-1, k, k) + RIDGE * np.eye(k)
+    XtWy = (W * Y) @ X
+    beta = np.linalg.solve(XtWX, XtWy[:, :, None])[:, :, 0]
+    return beta, XtWX
+
+
+def _holdout_accuracy(X: np.ndarray, Y: np.ndarray, W: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Vectorized version of DemandForecaster.calculate_accuracy's 80/20 backtest"""
+    split = int(X.shape[0] * (1 - HOLDOUT_FRACTION))
+    train = W.copy()
+    train[:, split:] = 0
+    test = W - train
+
+    beta, _ = _weighted_solve(X, Y, train)
+    predicted = beta @ X.T
+
+    test_counts = test.sum(axis=1)
+    safe_counts = np.maximum(test_counts, 1)
+    mae = (np.abs(predicted - Y) * test).sum(axis=1) / safe_counts
+    mean_actual = (Y * test).sum(axis=1) / safe_counts
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = np.clip(100 - mae / mean_actual * 100, 0, 100)
+
+    # Same fallbacks as the per-product path
+    default = (counts < 14) | (test_counts < 3) | (mean_actual <= 0) | ~np.isfinite(accuracy)
+    return np.where(default, 85.0, accuracy)
+
+
+def fit_trend_weekly(history: HistoryMatrix, horizon: int, interval_width: float = 0.95) -> BatchFit:
+    """
+    Fit demand = intercept + slope * t + weekday effect for every product at once
+    and project it `horizon` days past the end of the shared date grid
+    """
+    W = history.observed.astype(float)
+    Y = np.nan_to_num(history.values)
+    counts = W.sum(axis=1)
+
+    origin = history.dates[0]
+    scale = float(max(len(history.dates), 1))
+    X = design_matrix(history.dates, origin, scale)
+
+    beta, XtWX = _weighted_solve(X, Y, W)
+
+    future_dates = history.dates[-1] + np.arange(1, horizon + 1)
+    Xf = design_matrix(future_dates, origin, scale)
+    yhat = beta @ Xf.T
+
+    # Prediction intervals from residual variance plus parameter uncertainty
+    residuals = (Y - beta @ X.T) * W
+    dof = np.maximum(counts - X.shape[1], 1)
+    sigma = np.sqrt((residuals ** 2).sum(axis=1) / dof)
+    leverage = np.einsum('hk,pkj,hj->ph', Xf, np.linalg.inv(XtWX), Xf)
+    spread = interval_z(interval_width) * sigma[:, None] * np.sqrt(1 + leverage)
+
+    trend, seasonality = detect_profiles(history)  # One set of labels for every batch path
+
+    return BatchFit(
+        product_ids=history.product_ids,
+        future_dates=future_dates,
+        yhat=yhat,
+        yhat_lower=yhat - spread,
+        yhat_upper=yhat + spread,
+        accuracy=_holdout_accuracy(X, Y, W, counts),
+        trend=trend,
+        seasonality=seasonality,
+        history_length=counts.astype(int)
+    )
+
+
+def _right_align(history: HistoryMatrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Shift every row so its last observation lands in the last column. Inside each
+    product's observed span missing days count as zero demand (as in prepare_data);
+    outside it cells are NaN. Returns (values, weekday, span_length).
+    """
+    observed = history.observed
+    P, T = observed.shape
+    has_data = observed.any(axis=1)
+    first = np.where(has_data, observed.argmax(axis=1), T)
+    last = np.where(has_data, T - 1 - observed[:, ::-1].argmax(axis=1), T - 1)
+
+    source = np.arange(T)[None, :] - (T - 1 - last)[:, None]
+    in_span = (source >= first[:, None]) & has_data[:, None]
+    clipped = np.clip(source, 0, T - 1)
+
+    values = np.take_along_axis(np.nan_to_num(history.values), clipped, axis=1)
+    values[~in_span] = np.nan
+
+    weekday = (history.dates.astype('datetime64[D]').astype(np.int64)[clipped] + 3) % 7
+    return values, weekday, in_span.sum(axis=1)
+
+
+def _rolling_mean(values: np.ndarray, window: int, centered: bool = False) -> np.ndarray:
+    """Row-wise rolling mean; windows touching NaN cells are NaN"""
+    P, T = values.shape
+    out = np.full((P, T), np.nan)
+    if T < window:
+        return out
+
+    def window_sums(x: np.ndarray) -> np.ndarray:
+        cumulative = np.concatenate([np.zeros((P, 1)), np.cumsum(x, axis=1)], axis=1)
+        return cumulative[:, window:] - cumulative[:, :-window]
+
+    missing = np.isnan(values)
+    means = window_sums(np.where(missing, 0, values)) / window
+    means[window_sums(missing.astype(float)) > 0] = np.nan
+
+    offset = window // 2 if centered else window - 1
+    out[:, offset:offset + means.shape[1]] = means
+    return out
+
+
+def _lag_autocorrelation(x: np.ndarray, lag: int) -> np.ndarray:
+    """Autocorrelation at `lag` of every row (NaN treated as missing), via one batched FFT"""
+    mask = ~np.isnan(x)
+    counts = np.maximum(mask.sum(axis=1), 1)
+    centered = np.where(mask, x - np.nansum(x, axis=1, keepdims=True) / counts[:, None], 0)
+
+    size = 2 * x.shape[1]
+    spectrum = np.fft.rfft(centered, n=size, axis=1)
+    acov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(acov[:, 0] > 0, acov[:, lag] / acov[:, 0], 0)
+
+
+def detect_profiles(history: HistoryMatrix) -> Tuple[List[str], List[str]]:
+    """
+    Trend and weekly-seasonality labels for every row of an aligned history matrix
+    in one vectorized pass.
+
+    Trend: change of the trailing 7-day mean between the last two five-day windows
+    (the per-product heuristic). Seasonality: classical decomposition - detrend
+    with a centered 7-day mean, take weekday means as the seasonal component and
+    score its strength as 1 - var(remainder) / var(detrended). Rows whose
+    detrended series has no significant lag-7 autocorrelation (FFT-based) are
+    labelled 'none' whatever their strength.
+    """
+    P, T = history.values.shape
+    if T == 0:
+        return ['stable'] * P, ['none'] * P
+
+    values, weekday, span = _right_align(history)
+
+    # Trend from the trailing 7-day mean
+    ma = _rolling_mean(values, SEASON_LENGTH)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN windows for short rows
+        recent = np.nanmean(ma[:, -5:], axis=1) - np.nanmean(ma[:, -10:-5], axis=1)
+    recent = np.nan_to_num(recent)
+    trend = np.select([recent > TREND_THRESHOLD, recent < -TREND_THRESHOLD], ['increasing', 'decreasing'], 'stable')
+
+    # Weekly seasonal strength from a classical decomposition
+    detrended = values - _rolling_mean(values, SEASON_LENGTH, centered=True)
+    valid = ~np.isnan(detrended)
+    seasonal = np.zeros((P, T))
+    for day in range(SEASON_LENGTH):
+        cells = valid & (weekday == day)
+        day_mean = np.where(cells, detrended, 0).sum(axis=1) / np.maximum(cells.sum(axis=1), 1)
+        seasonal[cells] = np.broadcast_to(day_mean[:, None], (P, T))[cells]
+
+    remainder = np.where(valid, detrended - seasonal, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        strength = np.nan_to_num(np.clip(1 - np.nanvar(remainder, axis=1) / np.nanvar(detrended, axis=1), 0, 1))
+
+    # Weekly period test: lag-7 autocorrelation above the white-noise band
+    n_valid = np.maximum(valid.sum(axis=1), 1)
+    periodic = _lag_autocorrelation(np.where(valid, detrended, np.nan), SEASON_LENGTH) > 2 / np.sqrt(n_valid)
+
+    levels = [(strength > threshold) & periodic for threshold, _ in SEASONAL_STRENGTH_LEVELS]
+    seasonality = np.select(levels, [label for _, label in SEASONAL_STRENGTH_LEVELS], 'none')
+
+    # Same fallbacks as the per-product detector
+    seasonality = np.where(span >= SEASONAL_MIN_POINTS, seasonality, 'low')
+    short = span < SEASON_LENGTH
+    trend = np.where(short, 'stable', trend)
+    seasonality = np.where(short, 'none', seasonality)
+
+    return trend.tolist(), seasonality.tolist()
+
+
+def profile_histories(histories: Dict[str, List[Dict[str, Any]]],
+                      chunk_size: int = 5000) -> Dict[str, Tuple[str, str]]:
+    """(trend, seasonality) for every product, detected in chunks of aligned histories"""
+    profiles = {}
+    product_ids = list(histories)
+
+    for offset in range(0, len(product_ids), chunk_size):
+        chunk = {pid: histories[pid] for pid in product_ids[offset:offset + chunk_size]}
+        history = stack_histories(chunk)
+        trend, seasonality = detect_profiles(history)
+        profiles.update(zip(history.product_ids, zip(trend, seasonality)))
+
+    return profiles
+
+
+def forecast_many(histories: Dict[str, List[Dict[str, Any]]], names: Dict[str, str],
+                  horizon: int = 30, chunk_size: int = 5000) -> Dict[str, ForecastResult]:
+    """
+    Forecast every product in `histories` with the vectorized trend + weekly model.
+    Products with fewer than MIN_POINTS observations are left out of the result.
+    """
+    forecaster = DemandForecaster()
+    results = {}
+    product_ids = list(histories)
+
+    for offset in range(0, len(product_ids), chunk_size):
+        chunk = {pid: histories[pid] for pid in product_ids[offset:offset + chunk_size]}
+        fit = fit_trend_weekly(stack_histories(chunk), horizon)
+
+        for row, product_id in enumerate(fit.product_ids):
+            if fit.history_length[row] < MIN_POINTS:
+                continue
+
+            request = ForecastRequest(
+                product_id=product_id,
+                product_name=names.get(product_id, 'Unknown Product'),
+                historical_data=[],
+                forecast_days=horizon
+            )
+            results[product_id] = forecaster.build_result(
+                request,
+                dates=fit.future_dates,
+                yhat=fit.yhat[row],
+                yhat_lower=fit.yhat_lower[row],
+                yhat_upper=fit.yhat_upper[row],
+                trend=fit.trend[row],
+                seasonality=fit.seasonality[row],
+                accuracy=float(fit.accuracy[row]),
+                history_length=int(fit.history_length[row]),
+                engine=VECTORIZED_ENGINE
+            )
+
+    return results
@@ -1,23 +1,56 @@
 import json
+import os
+import queue
+import threading
 import boto3
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import pandas as pd
-from lambda_function import DemandForecaster, ForecastRequest
+from lambda_function import ACCURACY_HOLDOUT, DemandForecaster, ForecastRequest, ForecastResult
+from batch_engine import forecast_many
+from forecast_writer import BatchForecastWriter, to_dynamodb
+from hierarchy import DEFAULT_GROUP_KEY, forecast_hierarchy, group_products
+from model_store import default_model_store
+from pipeline import ForecastPipeline
+from prefetch import HistoryPrefetcher
+from shadow import shadow_recorder
+
+PER_PRODUCT_MODE = 'per_product'
+VECTORIZED_MODE = 'vectorized'
+HIERARCHICAL_MODE = 'hierarchical'
+
+# Parallel scan segments for product discovery (each pages through its share of the table)
+PRODUCT_SCAN_SEGMENTS = int(os.environ.get('PRODUCT_SCAN_SEGMENTS', '8'))
+# Scanned pages buffered per segment before the scan waits for the consumer
+PRODUCT_SCAN_BUFFER = int(os.environ.get('PRODUCT_SCAN_BUFFER', '2'))
+SCAN_PUT_SECONDS = 0.1  # How often a segment blocked on a full buffer checks for a stop
+# Product attributes the forecasting modes read
+PRODUCT_ATTRIBUTES = ('product_id', 'name', 'price')
+# History attributes the forecaster reads
+HISTORY_ATTRIBUTES = ('date', 'demand', 'price', 'promotion')
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 class BatchForecastProcessor:
-    def __init__(self):
+    def __init__(self, mode: Optional[str] = None, accuracy_mode: Optional[str] = None,
+                 group_key: Optional[str] = None):
         self.dynamodb = boto3.resource('dynamodb')
         self.sqs = boto3.client('sqs')
         self.products_table = None
         self.forecasts_table = None
         self.historical_data_table = None
         self.stage = os.environ.get('STAGE', 'dev')
+        self.mode = mode or os.environ.get('BATCH_FORECAST_MODE', PER_PRODUCT_MODE)
+        self.accuracy_mode = accuracy_mode or os.environ.get('BATCH_ACCURACY_MODE', ACCURACY_HOLDOUT)
+        self.model_store = default_model_store()
+        self.group_key = group_key or os.environ.get('BATCH_GROUP_KEY', DEFAULT_GROUP_KEY)
+        self.reconcile = os.environ.get('BATCH_RECONCILE', 'true').lower() == 'true'
+        self._local = threading.local()
+        self.writer: Optional[BatchForecastWriter] = None
         
     def initialize_tables(self):
         """Initialize DynamoDB table references"""
@@ -26,45 +59,181 @@ class BatchForecastProcessor:
         self.historical_data_table = self.dynamodb.Table(f'omnix-historical-data-{self.stage}')
     
     def get_active_products(self) -> List[Dict[str, Any]]:
-        """Retrieve all active products that need forecasting"""
-        try:
-            response = self.products_table.scan(
-                FilterExpression='attribute_exists(product_id) AND active = :active',
-                ExpressionAttributeValues={':active': True}
-            )
+        """
+        Retrieve all active products that need forecasting
+        Scan errors propagate: an empty list must mean an empty catalog, not a failed segment
+        """
+        return list(self.iter_active_products())
+    
+    def scan_segment(self, segment: int, total_segments: int, pages: queue.Queue,
+                     stop: Optional[threading.Event] = None) -> None:
+        """Page through one parallel-scan segment, putting each page's active products on `pages`"""
+        # boto3 resources are not thread-safe; each segment gets its own session
+        table = boto3.session.Session().resource('dynamodb').Table(self.products_table.name)
+        
+        attributes = list(dict.fromkeys(PRODUCT_ATTRIBUTES + (self.group_key,)))
+        names = {f'#a{index}': attribute for index, attribute in enumerate(attributes)}
+        
+        scan_kwargs = {
+            'FilterExpression': 'attribute_exists(product_id) AND active = :active',
+            'ExpressionAttributeValues': {':active': True},
+            'ProjectionExpression': ', '.join(names),
+            'ExpressionAttributeNames': names,  # 'name' is a reserved word
+            'Segment': segment,
+            'TotalSegments': total_segments
+        }
+        
+        while True:
+            response = table.scan(**scan_kwargs)
+            if response.get('Items') and not self.put_page(pages, response['Items'], stop):
+                return
             
-            return response.get('Items', [])
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key or (stop is not None and stop.is_set()):
+                return
+            scan_kwargs['ExclusiveStartKey'] = last_key
+    
+    @staticmethod
+    def put_page(pages: queue.Queue, page: Any, stop: Optional[threading.Event] = None) -> bool:
+        """Put `page` on the bounded `pages` queue, waiting for room; False if `stop` is set first"""
+        while not (stop is not None and stop.is_set()):
+            try:
+                pages.put(page, timeout=SCAN_PUT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def iter_active_products(self, total_segments: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every active product. The table is split into parallel scan
+        segments, each paginated to the end on its own thread, and products are
+        yielded as pages arrive. Segments wait while PRODUCT_SCAN_BUFFER pages
+        each are unconsumed, so the scan runs no further ahead than the consumer.
+        A failing segment raises after the others stop.
+        Closing the generator early stops every segment after its current page.
+        """
+        total_segments = max(1, total_segments or PRODUCT_SCAN_SEGMENTS)
+        pages: queue.Queue = queue.Queue(maxsize=total_segments * max(1, PRODUCT_SCAN_BUFFER))
+        done = object()
+        stop = threading.Event()
+        
+        def run(segment: int) -> None:
+            try:
+                self.scan_segment(segment, total_segments, pages, stop)
+            finally:
+                self.put_page(pages, done, stop)
+        
+        with ThreadPoolExecutor(max_workers=total_segments) as executor:
+            futures = [executor.submit(run, segment) for segment in range(total_segments)]
             
-        except Exception as e:
-            logger.error(f"Error retrieving products: {str(e)}")
-            return []
+            try:
+                remaining = total_segments
+                while remaining:
+                    page = pages.get()
+                    if page is done:
+                        remaining -= 1
+                        continue
+                    yield from page
+            finally:
+                stop.set()
+            
+            # Surface segment errors instead of returning part of the catalog
+            for future in futures:
+                future.result()
     
-    def get_historical_data(self, product_id: str, days: int = 90) -> List[Dict[str, Any]]:
-        """Retrieve historical demand data for a product"""
+    def get_historical_data(self, product_id: str, days: int = 90, table=None) -> List[Dict[str, Any]]:
+        """Retrieve historical demand data for a product (every page, forecaster attributes only)"""
         try:
+            table = table or self.historical_data_table
+            
             # Calculate date range
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=days)
             
-            response = self.historical_data_table.query(
-                KeyConditionExpression='product_id = :product_id AND #date BETWEEN :start_date AND :end_date',
-                ExpressionAttributeNames={'#date': 'date'},
-                ExpressionAttributeValues={
+            names = {f'#{attribute}': attribute for attribute in HISTORY_ATTRIBUTES}
+            query_kwargs = {
+                'KeyConditionExpression': 'product_id = :product_id AND #date BETWEEN :start_date AND :end_date',
+                'ProjectionExpression': ', '.join(names),
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': {
                     ':product_id': product_id,
                     ':start_date': start_date.isoformat(),
                     ':end_date': end_date.isoformat()
                 },
-                ScanIndexForward=True  # Sort by date ascending
-            )
+                'ScanIndexForward': True  # Sort by date ascending
+            }
             
-            return response.get('Items', [])
+            items = []
+            while True:
+                response = table.query(**query_kwargs)
+                items.extend(response.get('Items', []))
+                
+                last_key = response.get('LastEvaluatedKey')
+                if not last_key:
+                    return items
+                query_kwargs['ExclusiveStartKey'] = last_key
             
         except Exception as e:
             logger.error(f"Error retrieving historical data for {product_id}: {str(e)}")
             return []
     
+    def thread_table(self, table):
+        """The calling thread's handle on `table` (boto3 resources are not thread-safe, so each thread has its own session)"""
+        resource = getattr(self._local, 'dynamodb', None)
+        if resource is None:
+            resource = self._local.dynamodb = boto3.session.Session().resource('dynamodb')
+        
+        return resource.Table(table.name)
+    
+    def fetch_history(self, product_id: str) -> List[Dict[str, Any]]:
+        """get_historical_data for prefetch threads"""
+        return self.get_historical_data(product_id, table=self.thread_table(self.historical_data_table))
+    
+    def fetch_inputs(self, product_id: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """History and previous forecast for prefetch threads"""
+        return (
+            self.get_historical_data(product_id, table=self.thread_table(self.historical_data_table)),
+            self.get_previous_forecast(product_id, table=self.thread_table(self.forecasts_table))
+        )
+    
+    def prefetch_histories(self, products: List[Dict[str, Any]]) -> HistoryPrefetcher:
+        """Concurrent history queries for `products`, yielded as they arrive"""
+        return HistoryPrefetcher(self.fetch_history, products)
+    
+    def get_previous_forecast(self, product_id: str, table=None) -> Dict[str, Any]:
+        """
+        Retrieve what the product's latest forecast left behind for the next run:
+        fitted model parameters (warm start) and its accuracy score ('cached' mode)
+        """
+        try:
+            response = (table or self.forecasts_table).query(
+                KeyConditionExpression='product_id = :product_id',
+                ExpressionAttributeValues={':product_id': product_id},
+                ProjectionExpression='model_params, accuracy',
+                ScanIndexForward=False,  # Latest forecast first
+                Limit=1
+            )
+            
+            items = response.get('Items', [])
+            if not items:
+                return {}
+            
+            previous = items[0]
+            return {
+                'model_params': json.loads(previous['model_params']) if previous.get('model_params') else None,
+                'accuracy': float(previous['accuracy']) if previous.get('accuracy') is not None else None
+            }
+            
+        except Exception as e:
+            logger.warning(f"Error retrieving previous forecast for {product_id}: {str(e)}")
+            return {}
+    
     def save_forecast(self, product_id: str, forecast_data: Dict[str, Any]) -> bool:
-        """Save forecast results to DynamoDB"""
+        """
+        Save forecast results to DynamoDB. During a batch run the item is handed to
+        the background writer and True means queued; write failures show up in its stats.
+        """
         try:
             forecast_date = datetime.now().isoformat()
             
@@ -82,15 +251,134 @@ class BatchForecastProcessor:
                 'ttl': int((datetime.now() + timedelta(days=90)).timestamp())  # Expire after 90 days
             }
             
-            self.forecasts_table.put_item(Item=item)
+            # Fitted parameters warm-start tomorrow's fit for this product
+            if forecast_data.get('model_params'):
+                item['model_params'] = json.dumps(forecast_data['model_params'])
+            
+            if self.writer is not None:
+                self.writer.put(item)
+            else:
+                self.forecasts_table.put_item(Item=to_dynamodb(item))
             return True
             
         except Exception as e:
             logger.error(f"Error saving forecast for {product_id}: {str(e)}")
             return False
     
-    def process_product_forecast(self, product: Dict[str, Any]) -> bool:
-        """Process forecast for a single product"""
+    @staticmethod
+    def to_forecast_data(result: ForecastResult) -> Dict[str, Any]:
+        """Fields of a ForecastResult that are persisted with each forecast"""
+        return {
+            'forecast_data': result.forecast_data,
+            'trend': result.trend,
+            'seasonality': result.seasonality,
+            'accuracy': result.accuracy,
+            'next_order_date': result.next_order_date,
+            'recommended_quantity': result.recommended_quantity,
+            'confidence_metrics': result.confidence_metrics,
+            'model_params': result.model_params
+        }
+    
+    def load_histories(self, products: List[Dict[str, Any]]) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, str]]:
+        """Historical data and display name for each product, keyed by product id"""
+        histories = {}
+        names = {}
+        
+        for product, history in self.prefetch_histories(products):
+            product_id = product['product_id']
+            names[product_id] = product.get('name', 'Unknown Product')
+            histories[product_id] = history
+        
+        return histories, names
+    
+    def save_results(self, histories: Dict[str, List[Dict[str, Any]]], names: Dict[str, str],
+                     results: Dict[str, ForecastResult]) -> Tuple[int, int]:
+        """Save each product's result; products without one count as failed. Returns (processed, failed)."""
+        processed = 0
+        failed = 0
+        
+        for product_id in histories:
+            result = results.get(product_id)
+            
+            if result is None:
+                logger.warning(f"Insufficient historical data for {product_id}: {len(histories[product_id])} records")
+                failed += 1
+            elif self.save_forecast(product_id, self.to_forecast_data(result)):
+                processed += 1
+            else:
+                logger.error(f"Failed to save forecast for {names[product_id]}")
+                failed += 1
+        
+        return processed, failed
+    
+    def process_vectorized_forecasts(self, products: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Fit every product in one array pass (trend + weekly seasonality via batched
+        least squares) and save the results. Returns (processed, failed).
+        """
+        histories, names = self.load_histories(products)
+        
+        results = forecast_many(histories, names, horizon=30)
+        logger.info(f"Vectorized forecast produced {len(results)} of {len(histories)} products")
+        
+        return self.save_results(histories, names, results)
+    
+    def process_hierarchical_forecasts(self, products: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Fit one model per product group (self.group_key, e.g. category) on the group's
+        summed demand, then split it across the group's products by their recent
+        share of demand. Returns (processed, failed).
+        """
+        histories, names = self.load_histories(products)
+        groups = group_products(products, self.group_key)
+        logger.info(f"Forecasting {len(products)} products as {len(groups)} groups by {self.group_key}")
+        
+        results = forecast_hierarchy(
+            histories, names, groups,
+            horizon=30,
+            reconcile=self.reconcile,
+            forecaster=DemandForecaster(model_store=self.model_store),
+            accuracy_mode=self.accuracy_mode
+        )
+        
+        return self.save_results(histories, names, results)
+    
+    def build_request(self, product: Dict[str, Any], historical_data: List[Dict[str, Any]],
+                      profile: Optional[Tuple[str, str]], previous: Dict[str, Any]) -> Optional[ForecastRequest]:
+        """The product's ForecastRequest, or None when its history is too short to forecast"""
+        product_id = product['product_id']
+        
+        if len(historical_data) < 7:
+            logger.warning(f"Insufficient historical data for {product_id}: {len(historical_data)} records")
+            return None
+        
+        # Prepare data for forecasting (columnar, so the forecaster builds typed arrays directly)
+        default_price = product.get('price', 0)
+        formatted_data = {
+            'dates': [record['date'] for record in historical_data],
+            'demand': [record.get('demand', 0) for record in historical_data],
+            'price': [record.get('price', default_price) for record in historical_data],
+            'promotion': [record.get('promotion', 0) for record in historical_data]
+        }
+        
+        return ForecastRequest(
+            product_id=product_id,
+            product_name=product.get('name', 'Unknown Product'),
+            historical_data=formatted_data,
+            forecast_days=30,
+            init_params=previous.get('model_params'),
+            accuracy_mode=self.accuracy_mode,
+            cached_accuracy=previous.get('accuracy'),
+            profile=list(profile) if profile else None
+        )
+    
+    def process_product_forecast(self, product: Dict[str, Any],
+                                 historical_data: Optional[List[Dict[str, Any]]] = None,
+                                 profile: Optional[Tuple[str, str]] = None) -> bool:
+        """
+        Process forecast for a single product
+        historical_data and profile (trend, seasonality) are fetched/detected when not given
+        """
         try:
             product_id = product['product_id']
             product_name = product.get('name', 'Unknown Product')
@@ -98,46 +386,20 @@ class BatchForecastProcessor:
             logger.info(f"Processing forecast for {product_name} ({product_id})")
             
             # Get historical data
-            historical_data = self.get_historical_data(product_id)
+            if historical_data is None:
+                historical_data = self.get_historical_data(product_id)
             
-            if len(historical_data) < 7:
-                logger.warning(f"Insufficient historical data for {product_id}: {len(historical_data)} records")
+            forecast_request = self.build_request(product, historical_data, profile,
+                                                  self.get_previous_forecast(product_id))
+            if forecast_request is None:
                 return False
             
-            # Prepare data for forecasting
-            formatted_data = []
-            for record in historical_data:
-                formatted_data.append({
-                    'date': record['date'],
-                    'demand': record.get('demand', 0),
-                    'price': record.get('price', product.get('price', 0)),
-                    'promotion': record.get('promotion', 0)
-                })
-            
-            # Create forecast request
-            forecast_request = ForecastRequest(
-                product_id=product_id,
-                product_name=product_name,
-                historical_data=formatted_data,
-                forecast_days=30
-            )
-            
             # Generate forecast
-            forecaster = DemandForecaster()
+            forecaster = DemandForecaster(model_store=self.model_store)
             result = forecaster.generate_forecast(forecast_request)
             
             # Save results
-            forecast_data = {
-                'forecast_data': result.forecast_data,
-                'trend': result.trend,
-                'seasonality': result.seasonality,
-                'accuracy': result.accuracy,
-                'next_order_date': result.next_order_date,
-                'recommended_quantity': result.recommended_quantity,
-                'confidence_metrics': result.confidence_metrics
-            }
-            
-            success = self.save_forecast(product_id, forecast_data)
+            success = self.save_forecast(product_id, self.to_forecast_data(result))
             
             if success:
                 logger.info(f"Successfully processed forecast for {product_name}")
@@ -150,18 +412,43 @@ class BatchForecastProcessor:
             logger.error(f"Error processing forecast for product {product.get('product_id', 'unknown')}: {str(e)}")
             return False
     
-    def run_batch_forecast(self) -> Dict[str, Any]:
-        """Run batch forecasting for all products"""
+    def process_products(self, products: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Forecast and save `products` with a whole-catalog mode. Returns (processed, failed)."""
+        if self.mode == VECTORIZED_MODE:
+            return self.process_vectorized_forecasts(products)
+        
+        return self.process_hierarchical_forecasts(products)
+    
+    def run_batch_forecast(self, context=None) -> Dict[str, Any]:
+        """
+        Run batch forecasting for all products
+        context (the Lambda context) lets the per-product pipeline drain before the function times out
+        """
         try:
             logger.info("Starting batch forecasting process")
             
             self.initialize_tables()
             
-            # Get all active products
-            products = self.get_active_products()
-            logger.info(f"Found {len(products)} active products")
+            # Saves go to a background batch writer so fitting never waits on DynamoDB
+            self.writer = BatchForecastWriter(self.forecasts_table.name)
+            try:
+                if self.mode in (VECTORIZED_MODE, HIERARCHICAL_MODE):
+                    # Get all active products
+                    products = self.get_active_products()
+                    logger.info(f"Found {len(products)} active products")
+                    
+                    processed, failed = self.process_products(products) if products else (0, 0)
+                    summary = {'total_products': len(products), 'catalog_complete': True}
+                else:
+                    # Discovery, fetch, fit and write overlap in a bounded streaming pipeline
+                    summary = ForecastPipeline(self, context).run()
+                    processed, failed = summary.pop('processed'), summary.pop('failed')
+                    logger.info(f"Pipeline stages: {json.dumps(summary['stages'])}")
+            finally:
+                write_stats = self.writer.close()
+                self.writer = None
             
-            if not products:
+            if not summary['total_products'] and summary['catalog_complete']:
                 return {
                     'success': True,
                     'message': 'No active products found',
@@ -169,30 +456,25 @@ class BatchForecastProcessor:
                     'failed': 0
                 }
             
-            # Process each product
-            processed = 0
-            failed = 0
-            
-            for product in products:
-                try:
-                    success = self.process_product_forecast(product)
-                    if success:
-                        processed += 1
-                    else:
-                        failed += 1
-                        
-                except Exception as e:
-                    logger.error(f"Unexpected error processing product {product.get('product_id')}: {str(e)}")
-                    failed += 1
+            # Forecasts that were queued but never written count as failed
+            processed -= write_stats['failed']
+            failed += write_stats['failed']
+            logger.info(f"Forecast writes: {json.dumps(write_stats)}")
             
             logger.info(f"Batch forecasting completed. Processed: {processed}, Failed: {failed}")
             
+            shadow_stats = shadow_recorder.stats()
+            if shadow_stats:
+                logger.info(f"Shadow engine results: {json.dumps(shadow_stats)}")
+            
             return {
                 'success': True,
                 'message': f'Batch forecasting completed successfully',
                 'processed': processed,
                 'failed': failed,
-                'total_products': len(products)
+                **summary,
+                'mode': self.mode,
+                'writes': write_stats
             }
             
         except Exception as e:
@@ -209,8 +491,12 @@ def lambda_handler(event, context):
     try:
         logger.info("Starting batch forecast Lambda execution")
         
-        processor = BatchForecastProcessor()
-        result = processor.run_batch_forecast()
+        processor = BatchForecastProcessor(
+            mode=event.get('mode'),
+            accuracy_mode=event.get('accuracy_mode'),
+            group_key=event.get('group_key')
+        )
+        result = processor.run_batch_forecast(context)
         
         return {
             'statusCode': 200,
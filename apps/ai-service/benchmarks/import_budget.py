@@ -0,0 +1,98 @@
+"""
+Cold-import budget check for the forecast Lambda
+
+Runs each action's import path in a fresh interpreter and fails when it loads
+a module it should not need or takes longer than its budget. Run it after
+touching imports in lambda_function.py or the modules it pulls in:
+
+    python benchmarks/import_budget.py [--scale 1.5] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import heavy forecasting dependencies only where the action actually needs them
+ACTIONS: Dict[str, Dict[str, Any]] = {
+    'recommendations': {
+        'code': (
+            "import lambda_function\n"
+            "lambda_function.RecommendationEngine().generate_recommendations(["
+            "{'product_id': 'p', 'product_name': 'P', 'current_stock': 1}])\n"
+        ),
+        'forbidden': ['numpy', 'pandas', 'prophet', 'cmdstanpy', 'sklearn'],
+        'budget_ms': 1500,
+    },
+    'forecast': {
+        'code': (
+            "import lambda_function\n"
+            "import engines, model_cache\n"
+            "from prophet import Prophet\n"
+        ),
+        'forbidden': ['sklearn'],
+        'budget_ms': 8000,
+    },
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], '<action>', 'exec'))
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({'ms': elapsed, 'modules': sorted({name.split('.')[0] for name in sys.modules})}))
+"""
+
+
+def measure(code: str) -> Dict[str, Any]:
+    """Import-and-run `code` in a fresh interpreter, returning elapsed ms and loaded top-level modules"""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, code],
+        cwd=SERVICE_DIR,
+        env={**os.environ, 'POWERTOOLS_TRACE_DISABLED': '1'},
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every time budget (slow machines)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    report = {}
+    failed = False
+
+    for action, spec in ACTIONS.items():
+        result = measure(spec['code'])
+        budget = spec['budget_ms'] * args.scale
+        leaked = [name for name in spec['forbidden'] if name in result['modules']]
+        ok = result['ms'] <= budget and not leaked
+        failed = failed or not ok
+
+        report[action] = {
+            'ms': round(result['ms'], 1),
+            'budget_ms': budget,
+            'forbidden_loaded': leaked,
+            'ok': ok
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for action, entry in report.items():
+            status = 'OK  ' if entry['ok'] else 'FAIL'
+            leaked = f" loaded {', '.join(entry['forbidden_loaded'])}" if entry['forbidden_loaded'] else ''
+            print(f"{status} {action:<16} {entry['ms']:>8.1f} ms (budget {entry['budget_ms']:.0f} ms){leaked}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
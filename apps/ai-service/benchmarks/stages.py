@@ -0,0 +1,210 @@
+"""
+Stage-by-stage benchmark for DemandForecaster
+
+Times prepare_data, detect_trend_and_seasonality, train_model, calculate_accuracy,
+predict and build_result separately on deterministic synthetic histories,
+sweeping history length, horizon, regressors and seasonality. Results are
+written as JSON so runs can be compared between commits:
+
+    python benchmarks/stages.py --output before.json
+    python benchmarks/stages.py --output after.json --compare before.json
+    python benchmarks/stages.py --quick
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+os.environ.setdefault('POWERTOOLS_TRACE_DISABLED', '1')
+
+import numpy as np  # noqa: E402
+
+from lambda_function import ACCURACY_HOLDOUT, DemandForecaster, ForecastRequest  # noqa: E402
+
+STAGES = ('prepare_data', 'detect_trend_and_seasonality', 'train_model', 'calculate_accuracy',
+          'predict', 'build_result')
+
+GRID = {
+    'history_days': [60, 180, 730],
+    'horizon': [7, 30, 90],
+    'regressors': [False, True],
+    'seasonality': ['none', 'weekly'],
+}
+QUICK_GRID = {
+    'history_days': [60, 365],
+    'horizon': [30],
+    'regressors': [False, True],
+    'seasonality': ['weekly'],
+}
+
+START_DATE = np.datetime64('2023-01-01')
+
+
+def synthetic_history(days: int, regressors: bool, seasonality: str, seed: int = 7) -> Dict[str, list]:
+    """Deterministic daily demand: level + trend (+ weekly cycle) (+ price/promotion effects) + noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+
+    demand = 40 + 0.05 * t + rng.normal(0, 3, days)
+    if seasonality == 'weekly':
+        demand += 10 * np.sin(2 * np.pi * t / 7)
+
+    history = {'dates': np.datetime_as_string(START_DATE + t, unit='D').tolist()}
+    if regressors:
+        price = np.round(9.99 + rng.choice([0, -1, 1], days, p=[0.8, 0.1, 0.1]), 2)
+        promotion = (rng.random(days) < 0.1).astype(int)
+        demand += -4 * (price - 9.99) + 12 * promotion
+        history['price'] = price.tolist()
+        history['promotion'] = promotion.tolist()
+
+    history['demand'] = np.maximum(demand, 0).round().tolist()
+    return history
+
+
+def timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - started) * 1000
+
+
+def run_case(history_days: int, horizon: int, regressors: bool, seasonality: str, repeat: int) -> Dict[str, Any]:
+    """Run every stage `repeat` times on one synthetic series and keep the median per stage"""
+    from design_cache import design_cache
+
+    history = synthetic_history(history_days, regressors, seasonality)
+    request = ForecastRequest(product_id='bench', product_name='Benchmark', historical_data=history,
+                              forecast_days=horizon)
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    for _ in range(repeat):
+        design_cache.clear()  # Measure cold fits; a batch run would hit the cache after its first product
+        forecaster = DemandForecaster()
+
+        df, ms = timed(lambda: forecaster.prepare_data(history))
+        timings['prepare_data'].append(ms)
+
+        (trend, detected), ms = timed(lambda: forecaster.detect_trend_and_seasonality(df))
+        timings['detect_trend_and_seasonality'].append(ms)
+
+        model, ms = timed(lambda: forecaster.train_model(df, trend, detected))
+        timings['train_model'].append(ms)
+
+        accuracy, ms = timed(lambda: forecaster.calculate_accuracy(model, df, ACCURACY_HOLDOUT))
+        timings['calculate_accuracy'].append(ms)
+
+        forecast, ms = timed(lambda: forecaster.predict(model, df, horizon))
+        timings['predict'].append(ms)
+
+        tail = forecast.tail(horizon)
+        _, ms = timed(lambda: forecaster.build_result(
+            request, dates=tail['ds'].values, yhat=tail['yhat'].values,
+            yhat_lower=tail['yhat_lower'].values, yhat_upper=tail['yhat_upper'].values,
+            trend=trend, seasonality=detected, accuracy=accuracy,
+            history_length=len(df), engine='prophet'
+        ))
+        timings['build_result'].append(ms)
+
+    stages = {stage: round(statistics.median(values), 3) for stage, values in timings.items()}
+    return {
+        'history_days': history_days,
+        'horizon': horizon,
+        'regressors': regressors,
+        'seasonality': seasonality,
+        'detected': [trend, detected],
+        'stages_ms': stages,
+        'total_ms': round(sum(stages.values()), 3)
+    }
+
+
+def environment() -> Dict[str, Any]:
+    import pandas
+    import prophet
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'prophet': prophet.__version__,
+    }
+
+
+def case_key(case: Dict[str, Any]) -> Tuple:
+    return case['history_days'], case['horizon'], case['regressors'], case['seasonality']
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print per-stage ratios (current / baseline) for cases present in both reports"""
+    previous = {case_key(case): case for case in baseline['results']}
+    print(f"\nCompared with {baseline['environment'].get('commit')} (ratio current/baseline, <1 is faster)")
+    print(f"{'case':<28}" + ''.join(f"{stage[:12]:>14}" for stage in STAGES) + f"{'total':>10}")
+
+    for case in report['results']:
+        old = previous.get(case_key(case))
+        if old is None:
+            continue
+        ratios = [case['stages_ms'][stage] / max(old['stages_ms'][stage], 1e-9) for stage in STAGES]
+        total = case['total_ms'] / max(old['total_ms'], 1e-9)
+        label = '{}d h{} {} {}'.format(*case_key(case)[:2], 'reg' if case['regressors'] else 'noreg',
+                                        case['seasonality'])
+        print(f"{label:<28}" + ''.join(f"{ratio:>14.2f}" for ratio in ratios) + f"{total:>10.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='Small grid for a fast sanity run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the median is reported')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    args = parser.parse_args()
+
+    # cmdstanpy installs its own INFO handler unless the logger already has one
+    for name in ('cmdstanpy', 'prophet'):
+        logging.getLogger(name).addHandler(logging.NullHandler())
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    grid = QUICK_GRID if args.quick else GRID
+    results = []
+
+    for history_days, horizon, regressors, seasonality in itertools.product(*grid.values()):
+        case = run_case(history_days, horizon, regressors, seasonality, args.repeat)
+        results.append(case)
+        stages = ' '.join(f"{stage.split('_')[0]}={ms:.1f}" for stage, ms in case['stages_ms'].items())
+        print(f"{history_days:>5}d h{horizon:<3} {'reg  ' if regressors else 'noreg'} {seasonality:<7}"
+              f"{case['total_ms']:>9.1f} ms  {stages}")
+
+    report = {'environment': environment(), 'grid': grid, 'repeat': args.repeat, 'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            compare(report, json.load(handle))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
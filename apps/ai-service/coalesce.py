@@ -0,0 +1,82 @@
+import dataclasses
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key: the first caller runs the function,
+    callers arriving while it is in flight wait and share its result (or error).
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True when another caller did the work"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """executed: calls that ran; coalesced: calls served by an in-flight call (fits saved)"""
+        with self._lock:
+            return {'executed': self._executed, 'coalesced': self._coalesced, 'in_flight': len(self._calls)}
+
+
+def _encode(value: Any) -> str:
+    """JSON fallback: arrays by dtype, shape and a hash of their bytes (str() elides long arrays with '...')"""
+    if hasattr(value, 'to_numpy'):
+        value = value.to_numpy()
+    if hasattr(value, 'tobytes') and hasattr(value, 'dtype'):
+        data = repr(value.tolist()).encode() if value.dtype.kind == 'O' else value.tobytes()
+        return f"{value.dtype}{value.shape}:{hashlib.sha256(data).hexdigest()}"
+    return str(value)
+
+
+def request_key(request: Any) -> str:
+    """Stable hash of a (dataclass) request after normalizing it to sorted JSON"""
+    payload = dataclasses.asdict(request) if dataclasses.is_dataclass(request) else request
+    normalized = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=_encode)
+    return hashlib.sha256(normalized.encode()).hexdigest()
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('FORECAST_DESIGN_CACHE_SIZE', '256'))
+
+
+def date_grid_key(dates: pd.Series) -> str:
+    """Identify an exact date grid (length plus a hash of the timestamps)"""
+    values = np.ascontiguousarray(dates.to_numpy(dtype='datetime64[ns]')).view(np.int64)
+    return f"{len(values)}:{hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()}"
+
+
+class DesignCache:
+    """
+    LRU cache of calendar-derived design pieces (Fourier features, changepoint
+    layouts). They depend only on the dates and model settings, so every fit
+    on the same calendar - nearly all products in a batch run - can share them.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            self._misses += 1
+
+        value = build()
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False  # Shared between models
+
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'entries': len(self._entries)}
+
+
+# Shared across warm invocations of the same container
+design_cache = DesignCache()
+
+
+class CachedDesignProphet(Prophet):
+    """
+    Prophet that takes its Fourier seasonality features and its changepoint
+    layout from design_cache, keyed by date grid and settings, instead of
+    rebuilding them for every fit and predict
+    """
+
+    @staticmethod
+    def fourier_series(dates: pd.Series, period: float, series_order: int) -> np.ndarray:
+        key = ('fourier', date_grid_key(dates), float(period), int(series_order))
+        return design_cache.get_or_build(key, lambda: Prophet.fourier_series(dates, period, series_order))
+
+    def set_changepoints(self) -> None:
+        # Explicit changepoints only need validating; nothing to reuse
+        if self.changepoints is not None:
+            return super().set_changepoints()
+
+        key = ('changepoints', date_grid_key(self.history['ds']), self.n_changepoints, self.changepoint_range)
+
+        def build() -> tuple:
+            super(CachedDesignProphet, self).set_changepoints()
+            return self.n_changepoints, self.changepoints, self.changepoints_t
+
+        self.n_changepoints, self.changepoints, self.changepoints_t = design_cache.get_or_build(key, build)
@@ -0,0 +1,193 @@
+from statistics import NormalDist
+from typing import Dict, Type
+
+import numpy as np
+import pandas as pd
+
+SEASON_LENGTH = 7  # Weekly seasonality on daily data
+
+# Engine selection thresholds (number of daily observations)
+SEASONAL_NAIVE_MAX_POINTS = 14
+HOLT_WINTERS_MAX_POINTS = 120
+
+PROPHET = 'prophet'
+
+
+def interval_z(interval_width: float) -> float:
+    """Two-sided normal quantile for the given interval width"""
+    return NormalDist().inv_cdf(0.5 + interval_width / 2)
+
+
+def future_dates(df: pd.DataFrame, periods: int) -> np.ndarray:
+    """Daily dates following the last observation, like Prophet's make_future_dataframe"""
+    last = np.datetime64(df['ds'].iloc[-1], 'D')
+    return last + np.arange(1, periods + 1)
+
+
+class ForecastEngine:
+    """
+    Lightweight statistical forecaster returning a Prophet-shaped frame
+    (ds, yhat, yhat_lower, yhat_upper) covering history plus the horizon
+    """
+    name = 'base'
+
+    def __init__(self, trend: str = 'stable', seasonality: str = 'low', interval_width: float = 0.95):
+        self.trend = trend
+        self.seasonality = seasonality
+        self.interval_width = interval_width
+
+    def fit_predict(self, y: np.ndarray, periods: int) -> tuple:
+        """Return (in-sample fitted, future mean, future std) arrays"""
+        raise NotImplementedError
+
+    def forecast(self, df: pd.DataFrame, periods: int) -> pd.DataFrame:
+        y = df['y'].to_numpy(dtype=float)
+        fitted, mean, std = self.fit_predict(y, periods)
+
+        z = interval_z(self.interval_width)
+        yhat = np.concatenate([fitted, mean])
+        spread = np.concatenate([np.zeros_like(fitted), z * std])
+
+        return pd.DataFrame({
+            'ds': np.concatenate([df['ds'].to_numpy(dtype='datetime64[ns]'),
+                                  future_dates(df, periods).astype('datetime64[ns]')]),
+            'yhat': yhat,
+            'yhat_lower': yhat - spread,
+            'yhat_upper': yhat + spread
+        })
+
+
+class SeasonalNaiveEngine(ForecastEngine):
+    """Repeat the last observed week; intervals widen with each season ahead"""
+    name = 'seasonal_naive'
+
+    def fit_predict(self, y: np.ndarray, periods: int) -> tuple:
+        season = SEASON_LENGTH if len(y) >= SEASON_LENGTH else len(y)
+
+        fitted = y.copy()
+        fitted[season:] = y[:-season]
+        residuals = y[season:] - y[:-season]
+        sigma = residuals.std() if len(residuals) > 1 else y.std()
+
+        steps = np.arange(periods)
+        mean = y[len(y) - season + steps % season]
+        std = sigma * np.sqrt(steps // season + 1)
+
+        return fitted, mean, std
+
+
+class HoltWintersEngine(ForecastEngine):
+    """
+    Additive Holt-Winters with damped trend. Smoothing parameters are chosen by
+    running the recursion for a whole parameter grid at once as NumPy vectors
+    and keeping the combination with the lowest one-step squared error.
+    """
+    name = 'holt_winters'
+
+    ALPHAS = (0.1, 0.3, 0.5, 0.8)
+    BETAS = (0.01, 0.1, 0.3)
+    GAMMAS = (0.05, 0.2, 0.5)
+    PHI = 0.98
+
+    def _grid(self) -> tuple:
+        seasonal = self.seasonality != 'none'
+        trended = self.trend != 'stable'
+
+        betas = self.BETAS if trended else (0.0,)
+        gammas = self.GAMMAS if seasonal else (0.0,)
+        grid = np.array(np.meshgrid(self.ALPHAS, betas, gammas, indexing='ij')).reshape(3, -1)
+        return grid[0], grid[1], grid[2], seasonal, trended
+
+    def fit_predict(self, y: np.ndarray, periods: int) -> tuple:
+        alpha, beta, gamma, seasonal, trended = self._grid()
+        n, g = len(y), alpha.shape[0]
+        season = SEASON_LENGTH
+        phi = self.PHI if trended else 0.0
+
+        # Initial state from the first one/two seasons
+        first = y[:season]
+        level = np.full(g, first.mean())
+        if trended and n >= 2 * season:
+            slope = (y[season:2 * season].mean() - first.mean()) / season
+        else:
+            slope = 0.0
+        trend = np.full(g, slope if trended else 0.0)
+        seas = np.tile(first - first.mean() if seasonal else np.zeros(season), (g, 1))
+
+        fitted = np.empty((g, n))
+        for t in range(n):
+            idx = t % season
+            s = seas[:, idx]
+            fitted[:, t] = level + phi * trend + s
+
+            new_level = alpha * (y[t] - s) + (1 - alpha) * (level + phi * trend)
+            trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            seas[:, idx] = gamma * (y[t] - new_level) + (1 - gamma) * s
+            level = new_level
+
+        errors = y - fitted
+        best = int(np.argmin((errors ** 2).sum(axis=1)))
+
+        steps = np.arange(1, periods + 1)
+        damping = np.cumsum(phi ** steps) if trended else np.zeros(periods)
+        mean = level[best] + damping * trend[best] + seas[best, (n + steps - 1) % season]
+
+        sigma = errors[best].std()
+        std = sigma * np.sqrt(1 + (steps - 1) * alpha[best] ** 2)
+
+        return fitted[best], mean, std
+
+
+# Registry of engines selectable by name (request 'engine', SHADOW_ENGINE, select_engine)
+ENGINES: Dict[str, Type[ForecastEngine]] = {}
+
+
+def register_engine(engine: Type[ForecastEngine]) -> Type[ForecastEngine]:
+    """
+    Make a ForecastEngine subclass available by its `name`; usable as a class decorator:
+
+        @register_engine
+        class MyEngine(ForecastEngine):
+            name = 'my_engine'
+    """
+    if engine.name in ENGINES or engine.name == PROPHET:
+        raise ValueError(f"Forecasting engine already registered: {engine.name}")
+    ENGINES[engine.name] = engine
+    return engine
+
+
+register_engine(SeasonalNaiveEngine)
+register_engine(HoltWintersEngine)
+
+
+def get_engine(name: str, trend: str, seasonality: str, interval_width: float = 0.95) -> ForecastEngine:
+    if name not in ENGINES:
+        raise ValueError(f"Unknown forecasting engine: {name}. Available: {', '.join([PROPHET] + list(ENGINES))}")
+    return ENGINES[name](trend=trend, seasonality=seasonality, interval_width=interval_width)
+
+
+def has_active_regressors(df: pd.DataFrame) -> bool:
+    """True when price/promotion actually vary, which only Prophet can model"""
+    for column in ('price', 'promotion'):
+        if column in df.columns and df[column].nunique(dropna=True) > 1:
+            return True
+    return False
+
+
+def select_engine(df: pd.DataFrame, trend: str, seasonality: str) -> str:
+    """
+    Pick the cheapest engine that suits the series: seasonal-naive for very
+    short histories, Holt-Winters for short or simple ones, Prophet for long
+    series with both trend and seasonality, or with varying regressors
+    """
+    n = len(df)
+
+    if n < SEASONAL_NAIVE_MAX_POINTS:
+        return SeasonalNaiveEngine.name
+    if has_active_regressors(df):
+        return PROPHET
+    if n < HOLT_WINTERS_MAX_POINTS:
+        return HoltWintersEngine.name
+    if trend == 'stable' or seasonality in ('none', 'low'):
+        return HoltWintersEngine.name
+    return PROPHET
@@ -0,0 +1,222 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from lambda_function import DemandForecaster, ForecastRequest, ForecastResult, available_cpus
+from shadow import ShadowObservation, shadow_recorder
+
+# Memory one fit worker may need (a spawned interpreter with Prophet loaded, plus the fit)
+WORKER_MEMORY_MB = int(os.environ.get('FIT_WORKER_MEMORY_MB', '512'))
+
+logger = logging.getLogger(__name__)
+
+_worker_model_store = None
+
+
+@dataclass
+class FitOutcome:
+    """
+    A forecast plus whether an identical in-flight request in the same worker
+    served it (fit saved) and what its shadow engine run observed, if any
+    """
+    result: ForecastResult
+    coalesced: bool = False
+    shadow: Optional[ShadowObservation] = None
+
+
+def fit_workers(requested: Optional[int] = None) -> int:
+    """Workers for this machine: one per vCPU, capped by what the Lambda's memory can hold"""
+    if requested:
+        return max(1, requested)
+
+    workers = available_cpus()
+    memory_mb = int(os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', 0))
+    if memory_mb:
+        workers = min(workers, memory_mb // WORKER_MEMORY_MB)
+    return max(1, workers)
+
+
+def worker_forecaster() -> DemandForecaster:
+    """A forecaster sharing the worker's model store"""
+    global _worker_model_store
+    from model_store import default_model_store
+
+    if _worker_model_store is None:
+        _worker_model_store = default_model_store()
+    return DemandForecaster(model_store=_worker_model_store)
+
+
+def run_forecast(request: ForecastRequest, deadline: Optional[float], emit_metrics: bool) -> FitOutcome:
+    """generate_forecast with the time left until `deadline` (epoch seconds) as its budget"""
+    forecaster = worker_forecaster()
+    budget_ms = (deadline - time.time()) * 1000 if deadline is not None else None
+    result = forecaster.generate_forecast(request, budget_ms=budget_ms)
+    if emit_metrics and not forecaster.coalesced:
+        forecaster.stage_timer.emit(result.engine, forecaster.history_length, request.forecast_days)
+    return FitOutcome(result, forecaster.coalesced, forecaster.shadow_observation)
+
+
+def pack_history(forecaster: DemandForecaster, historical_data: Any) -> Tuple[shared_memory.SharedMemory, List[str], int]:
+    """
+    Prepare a history and copy its columns into one shared memory block, as rows
+    of a float64 (columns, days) array with dates as epoch days.
+    Returns (block, column names, days); the caller unlinks the block.
+    """
+    df = forecaster.prepare_data(historical_data)
+    columns = {'dates': df['ds'].to_numpy(dtype='datetime64[D]').astype(np.int64), 'demand': df['y'].to_numpy()}
+    for name in ('price', 'promotion'):
+        if name in df.columns:
+            columns[name] = df[name].to_numpy()
+
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(columns) * len(df) * 8))
+    np.ndarray((len(columns), len(df)), dtype=np.float64, buffer=block.buf)[:] = list(columns.values())
+    return block, list(columns), len(df)
+
+
+def fit_shared(block_name: str, names: List[str], days: int, request: ForecastRequest,
+               deadline: Optional[float], emit_metrics: bool) -> Tuple[Dict[str, Any], FitOutcome]:
+    """
+    Worker-process task: read the history from shared memory and forecast.
+    Returns (compact_result(), the FitOutcome without its result)
+    """
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        rows = np.ndarray((len(names), days), dtype=np.float64, buffer=block.buf).copy()
+    finally:
+        block.close()
+
+    columns = dict(zip(names, rows))
+    columns['dates'] = columns['dates'].astype(np.int64)
+    outcome = run_forecast(replace(request, historical_data=columns), deadline, emit_metrics)
+    return compact_result(outcome.result), replace(outcome, result=None)
+
+
+def compact_result(result: ForecastResult) -> Dict[str, Any]:
+    """ForecastResult with forecast_data as one array per field instead of a dict per day"""
+    compact = asdict(result)
+    points = compact.pop('forecast_data')
+    compact['forecast_columns'] = {
+        name: np.array([point[name] for point in points]) for name in (points[0] if points else {})
+    }
+    return compact
+
+
+def expand_result(compact: Dict[str, Any]) -> ForecastResult:
+    columns = compact.pop('forecast_columns')
+    names = list(columns)
+    forecast_data = [dict(zip(names, values)) for values in zip(*(column.tolist() for column in columns.values()))]
+    return ForecastResult(forecast_data=forecast_data, **compact)
+
+
+def shared_memory_available() -> bool:
+    try:
+        block = shared_memory.SharedMemory(create=True, size=8)
+    except OSError:
+        return False
+    block.close()
+    block.unlink()
+    return True
+
+
+class FitExecutor:
+    """
+    Runs DemandForecaster.generate_forecast for many products on worker
+    processes. Histories are prepared in the caller and handed over through
+    shared memory instead of pickled frames; workers send back result arrays,
+    and their shadow engine observations are recorded in this process's
+    shadow_recorder.
+    Where process pools or shared memory are unavailable (Lambda has neither
+    /dev/shm nor the semaphores pools need) it runs the same work on threads,
+    which still overlap through Prophet's cmdstan subprocess and NumPy.
+    """
+
+    def __init__(self, workers: Optional[int] = None, processes: bool = True):
+        self.workers = fit_workers(workers)
+        self.processes = False
+        self._pool: Executor
+
+        if processes and shared_memory_available():
+            try:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self.processes = True
+            except (OSError, ImportError, NotImplementedError) as e:
+                logger.warning(f"Process pool unavailable ({str(e)}), fitting on threads")
+
+        if not self.processes:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fit')
+        self._forecaster = DemandForecaster()  # Only prepares histories for packing
+
+    def submit(self, request: ForecastRequest, deadline: Optional[float] = None,
+               emit_metrics: bool = False) -> 'Future[FitOutcome]':
+        """
+        Forecast `request`; deadline (epoch seconds) bounds the fit like generate_forecast's budget.
+        emit_metrics emits the ForecastStageDuration metrics from wherever the fit runs.
+        """
+        if not self.processes:
+            return self._pool.submit(run_forecast, request, deadline, emit_metrics)
+
+        future: 'Future[FitOutcome]' = Future()
+        try:
+            block, names, days = pack_history(self._forecaster, request.historical_data)
+        except Exception as e:
+            future.set_exception(e)
+            return future
+
+        try:
+            task = self._pool.submit(fit_shared, block.name, names, days,
+                                     replace(request, historical_data={}), deadline, emit_metrics)
+        except Exception:
+            block.close()
+            block.unlink()
+            raise
+
+        def done(task: Future) -> None:
+            block.close()
+            block.unlink()
+            if future.cancelled():
+                return  # The caller gave up on it
+            if task.cancelled():
+                future.cancel()
+                future.set_running_or_notify_cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                compact, outcome = task.result()
+                if outcome.shadow is not None:
+                    shadow_recorder.record(outcome.shadow)  # Recorded in the worker's own recorder only
+                future.set_result(replace(outcome, result=expand_result(compact)))
+
+        task.add_done_callback(done)
+        future.add_done_callback(lambda future: task.cancel() if future.cancelled() else None)
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self) -> 'FitExecutor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown(wait=True, cancel_futures=exc_info[0] is not None)
+
+
+_shared_executor: Optional[FitExecutor] = None
+_shared_lock = threading.Lock()
+
+
+def shared_fit_executor(workers: Optional[int] = None) -> FitExecutor:
+    """One executor per warm container, so API calls do not pay for starting workers"""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = FitExecutor(workers)
+        return _shared_executor
@@ -0,0 +1,137 @@
+import logging
+import math
+import os
+import queue
+import random
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+BATCH_WRITE_LIMIT = 25  # DynamoDB's BatchWriteItem maximum
+FLUSH_SECONDS = float(os.environ.get('FORECAST_WRITE_FLUSH_SECONDS', '1.0'))
+BUFFER_ITEMS = int(os.environ.get('FORECAST_WRITE_BUFFER', '500'))
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_CAP_SECONDS = 5.0
+THROTTLE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+
+logger = logging.getLogger(__name__)
+
+
+def to_dynamodb(value: Any) -> Any:
+    """Floats become Decimals (boto3 rejects floats); NaN and infinity, which DynamoDB cannot store, become None"""
+    if isinstance(value, float):
+        return Decimal(str(value)) if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: to_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamodb(item) for item in value]
+    return value
+
+
+class BatchForecastWriter:
+    """
+    Buffers forecast items and writes them with BatchWriteItem on a background
+    thread, so fitting continues while writes drain. A batch is flushed once it
+    holds 25 items, once its oldest item has waited `flush_seconds`, and on
+    close(). UnprocessedItems and throttled requests are retried with full-jitter
+    exponential backoff. put() blocks when `buffer_items` are waiting.
+    """
+
+    def __init__(self, table_name: str, resource=None, flush_seconds: Optional[float] = None,
+                 buffer_items: Optional[int] = None):
+        self.table_name = table_name
+        # The writer thread is the only user, so it gets its own session
+        self.resource = resource or boto3.session.Session().resource('dynamodb')
+        self.flush_seconds = FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self._items: queue.Queue = queue.Queue(maxsize=max(BATCH_WRITE_LIMIT, buffer_items or BUFFER_ITEMS))
+        self._closed = object()
+        self._latencies_ms: List[float] = []
+        self._stats = {'written': 0, 'failed': 0, 'requests': 0, 'throttled': 0, 'retried_items': 0}
+        self._thread = threading.Thread(target=self._run, name='forecast-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self._items.put(to_dynamodb(item))
+
+    def close(self) -> Dict[str, Any]:
+        """Flush everything still buffered, stop the writer thread and return its stats"""
+        self._items.put(self._closed)
+        self._thread.join()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies_ms)
+        summary: Dict[str, Any] = dict(self._stats)
+        if latencies:
+            summary.update({
+                'latency_p50_ms': round(latencies[len(latencies) // 2], 1),
+                'latency_p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                'latency_max_ms': round(latencies[-1], 1)
+            })
+        return summary
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._items.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # Oldest buffered item has waited long enough
+
+            if item is self._closed:
+                self._flush(batch)
+                return
+
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+
+            if len(batch) >= BATCH_WRITE_LIMIT or (item is None and batch):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        requests = [{'PutRequest': {'Item': item}} for item in batch]
+
+        for attempt in range(MAX_ATTEMPTS):
+            if not requests:
+                return
+            if attempt:
+                self._stats['retried_items'] += len(requests)
+                time.sleep(random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+
+            started = time.perf_counter()
+            try:
+                response = self.resource.batch_write_item(RequestItems={self.table_name: requests})
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in THROTTLE_ERRORS:
+                    logger.error(f"Error writing {len(requests)} forecasts: {str(e)}")
+                    break
+                self._stats['throttled'] += 1
+                continue
+            except Exception as e:
+                logger.error(f"Error writing {len(requests)} forecasts: {str(e)}")
+                break
+            finally:
+                self._latencies_ms.append((time.perf_counter() - started) * 1000)
+                self._stats['requests'] += 1
+
+            unprocessed = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            self._stats['written'] += len(requests) - len(unprocessed)
+            if unprocessed:
+                self._stats['throttled'] += 1
+            requests = unprocessed
+
+        if requests:
+            logger.error(f"Failed to write {len(requests)} forecasts to {self.table_name}")
+            self._stats['failed'] += len(requests)
@@ -0,0 +1,169 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from batch_engine import HistoryMatrix, stack_histories
+from lambda_function import DemandForecaster, ForecastRequest, ForecastResult
+
+HIERARCHICAL_ENGINE = 'hierarchical'
+
+DEFAULT_GROUP_KEY = 'category'
+UNGROUPED = 'uncategorized'
+GROUP_ID_PREFIX = 'group#'
+MIN_POINTS = 7
+SHARE_WINDOW_DAYS = 28  # Recent demand the product shares are computed over
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GroupHistory:
+    """Aggregated history of one product group and how its demand splits across products"""
+    group: str
+    product_ids: List[str]
+    records: List[Dict[str, Any]]  # Daily group demand in DemandForecaster's input format
+    shares: np.ndarray  # (P,), sums to 1
+    history_length: np.ndarray  # Observations per product, (P,)
+
+
+def group_products(products: List[Dict[str, Any]], key: str = DEFAULT_GROUP_KEY) -> Dict[str, List[str]]:
+    """Product ids by the value of `key` (e.g. category); products without one share a group"""
+    groups: Dict[str, List[str]] = {}
+    for product in products:
+        groups.setdefault(str(product.get(key) or UNGROUPED), []).append(product['product_id'])
+    return groups
+
+
+def share_vector(history: HistoryMatrix, window: int = SHARE_WINDOW_DAYS) -> np.ndarray:
+    """
+    Each product's share of group demand over the last `window` days. Falls back
+    to the whole history, then to equal shares, when the group sold nothing.
+    """
+    values = np.maximum(np.nan_to_num(history.values), 0)
+
+    for totals in (values[:, -window:].sum(axis=1), values.sum(axis=1)):
+        total = totals.sum()
+        if total > 0:
+            return totals / total
+
+    return np.full(len(history.product_ids), 1 / max(len(history.product_ids), 1))
+
+
+def aggregate_histories(group: str, histories: Dict[str, List[Dict[str, Any]]],
+                        window: int = SHARE_WINDOW_DAYS) -> GroupHistory:
+    """Sum product histories into one daily group series (days nobody reported are left out)"""
+    history = stack_histories(histories)
+    observed = history.observed
+    any_observed = observed.any(axis=0)
+    demand = np.nansum(history.values, axis=0)
+
+    dates = np.datetime_as_string(history.dates[any_observed], unit='D')
+    records = [{'date': date, 'demand': value} for date, value in zip(dates.tolist(), demand[any_observed].tolist())]
+
+    return GroupHistory(
+        group=group,
+        product_ids=history.product_ids,
+        records=records,
+        shares=share_vector(history, window),
+        history_length=observed.sum(axis=1)
+    )
+
+
+def allocate(total: np.ndarray, shares: np.ndarray, reconcile: bool = True) -> np.ndarray:
+    """
+    Split group forecasts (H,) into product forecasts (P, H) by share.
+    With reconcile, every day is split into whole units that sum exactly to the
+    group's whole-unit forecast (largest-remainder rounding), so product
+    forecasts add up to the group forecast once truncated to units.
+    """
+    total = np.maximum(np.asarray(total, dtype=float), 0)
+    raw = shares[:, None] * total[None, :]
+    if not reconcile:
+        return raw
+
+    target = np.trunc(total)
+    raw = shares[:, None] * target[None, :]
+    base = np.floor(raw)
+    missing = (target - base.sum(axis=0)).round().astype(np.int64)  # Units left per day, < P
+
+    # Rank products by their fractional remainder each day; the top `missing` get one more unit
+    rank = np.argsort(np.argsort(-(raw - base), axis=0, kind='stable'), axis=0)
+
+    return base + (rank < missing[None, :])
+
+
+def disaggregate(group_result: ForecastResult, group: GroupHistory, names: Dict[str, str],
+                 forecaster: DemandForecaster, reconcile: bool = True) -> Dict[str, ForecastResult]:
+    """Per-product ForecastResults carved out of a group forecast"""
+    points = group_result.forecast_data
+    dates = np.array([point['date'] for point in points], dtype='datetime64[D]')
+    total = np.array([point['predicted'] for point in points], dtype=float)
+    shares = group.shares[:, None]
+
+    yhat = allocate(total, group.shares, reconcile)
+
+    # Each product gets its share of the group's interval bounds
+    yhat_lower = shares * np.asarray(group_result.yhat_lower, dtype=float)[None, :]
+    yhat_upper = shares * np.asarray(group_result.yhat_upper, dtype=float)[None, :]
+
+    results = {}
+    for row, product_id in enumerate(group.product_ids):
+        request = ForecastRequest(
+            product_id=product_id,
+            product_name=names.get(product_id, 'Unknown Product'),
+            historical_data=[],
+            forecast_days=len(dates)
+        )
+        results[product_id] = forecaster.build_result(
+            request,
+            dates=dates,
+            yhat=yhat[row],
+            yhat_lower=yhat_lower[row],
+            yhat_upper=yhat_upper[row],
+            trend=group_result.trend,
+            seasonality=group_result.seasonality,
+            accuracy=group_result.accuracy,
+            history_length=int(group.history_length[row]),
+            engine=f"{HIERARCHICAL_ENGINE}:{group_result.engine}"
+        )
+
+    return results
+
+
+def forecast_hierarchy(histories: Dict[str, List[Dict[str, Any]]], names: Dict[str, str],
+                       groups: Dict[str, List[str]], horizon: int = 30, reconcile: bool = True,
+                       forecaster: Optional[DemandForecaster] = None, **request_options) -> Dict[str, ForecastResult]:
+    """
+    Fit one model per group on summed demand and split it across the group's products.
+    request_options (accuracy_mode, engine, ...) are passed to each group's ForecastRequest.
+    Products in groups that cannot be forecast are left out of the result.
+    """
+    forecaster = forecaster or DemandForecaster()
+    results = {}
+
+    for group, product_ids in groups.items():
+        group_history = aggregate_histories(group, {pid: histories.get(pid, []) for pid in product_ids})
+
+        if len(group_history.records) < MIN_POINTS:
+            logger.warning(f"Insufficient historical data for group {group}: {len(group_history.records)} days")
+            continue
+
+        request = ForecastRequest(
+            product_id=f"{GROUP_ID_PREFIX}{group}",
+            product_name=group,
+            historical_data=group_history.records,
+            forecast_days=horizon,
+            **request_options
+        )
+
+        try:
+            group_result = forecaster.generate_forecast(request)
+        except Exception as e:
+            logger.error(f"Error forecasting group {group}: {str(e)}")
+            continue
+
+        results.update(disaggregate(group_result, group_history, names, forecaster, reconcile))
+
+    return results
@@ -1,28 +1,48 @@
+from __future__ import annotations
+
 import json
 import logging
-import pandas as pd
-import numpy as np
+import os
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
-from prophet import Prophet
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-import boto3
-from aws_lambda_powertools import Logger, Metrics, Tracer
+from typing import TYPE_CHECKING, Dict, List, Optional, Any, Union
+from dataclasses import dataclass, field
+from aws_lambda_powertools import Logger, Metrics, Tracer, single_metric
 from aws_lambda_powertools.logging import correlation_paths
 from aws_lambda_powertools.metrics import MetricUnit
+from coalesce import SingleFlight, request_key
+from shadow import ShadowObservation, shadow_recorder
+
+# pandas, numpy and Prophet cost seconds at cold start and only the forecasting
+# path needs them, so they (and the modules built on them) are imported inside
+# the functions that use them
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from prophet import Prophet
 
 logger = Logger()
 tracer = Tracer()
 metrics = Metrics()
 
+# Interactive requests skip the holdout refit unless they ask for it
+API_ACCURACY_MODE = os.environ.get('FORECAST_ACCURACY_MODE', 'cheap')
+
 @dataclass
 class ForecastRequest:
     product_id: str
     product_name: str
-    historical_data: List[Dict[str, Any]]
+    historical_data: Union[List[Dict[str, Any]], Dict[str, List[Any]]]  # Rows or columns, see prepare_data
     forecast_days: int = 30
     confidence_interval: float = 0.95
+    init_params: Optional[Dict[str, Any]] = None  # Warm start from a previous fit
+    engine: Optional[str] = None  # Force an engine instead of automatic selection
+    accuracy_mode: str = 'holdout'  # One of ACCURACY_MODES
+    cached_accuracy: Optional[float] = None  # Last stored backtest score, used by 'cached'
+    interval_mode: str = 'analytic'  # One of INTERVAL_MODES
+    quantiles: bool = False  # Add p10/p50/p90 to each forecast point
+    profile: Optional[List[str]] = None  # Precomputed [trend, seasonality], e.g. from batch detection
 
 @dataclass
 class ForecastResult:
@@ -35,43 +55,312 @@ class ForecastResult:
     next_order_date: str
     recommended_quantity: int
     confidence_metrics: Dict[str, float]
+    model_params: Optional[Dict[str, Any]] = None
+    engine: str = 'prophet'
+    degraded_stages: List[str] = field(default_factory=list)  # Stages skipped/downgraded to meet the deadline
+    # Raw interval bounds per forecast day; forecast_data only carries the clamped width ratio
+    yhat_lower: List[float] = field(default_factory=list)
+    yhat_upper: List[float] = field(default_factory=list)
 
-class DemandForecaster:
+WARM_START_PARAMS = ('k', 'm', 'sigma_obs', 'delta', 'beta')
+
+# Accuracy evaluation modes:
+#   none    - skip evaluation and report the default accuracy
+#   cheap   - in-sample error from the forecast already computed (or seasonal-naive error)
+#   holdout - refit on the first 80% of history and score the last 20%
+#   cached  - reuse the last stored holdout score, falling back to cheap
+ACCURACY_NONE = 'none'
+ACCURACY_CHEAP = 'cheap'
+ACCURACY_HOLDOUT = 'holdout'
+ACCURACY_CACHED = 'cached'
+ACCURACY_MODES = (ACCURACY_NONE, ACCURACY_CHEAP, ACCURACY_HOLDOUT, ACCURACY_CACHED)
+DEFAULT_ACCURACY = 85.0
+
+# Prediction interval modes:
+#   analytic - no Monte-Carlo sampling; bands from in-sample residual variance, widened with horizon
+#   sampling - Prophet's simulated trend paths (uncertainty_samples draws), higher fidelity but slower
+INTERVAL_ANALYTIC = 'analytic'
+INTERVAL_SAMPLING = 'sampling'
+INTERVAL_MODES = (INTERVAL_ANALYTIC, INTERVAL_SAMPLING)
+INTERVAL_WIDTH = 0.95
+PROPHET_UNCERTAINTY_SAMPLES = 1000
+QUANTILES = {'p10': 0.10, 'p50': 0.50, 'p90': 0.90}
+
+# Demand values below this are stored exactly as float32
+FLOAT32_EXACT_LIMIT = 2 ** 24
+
+# Time kept back from the Lambda deadline for serialization and the response
+RESPONSE_RESERVE_MS = 1500
+
+# Upper bound on products per forecast_batch call
+MAX_BATCH_REQUESTS = int(os.environ.get('FORECAST_BATCH_MAX_REQUESTS', '100'))
+BATCH_TIMED_OUT = 'Timed out before the Lambda deadline'  # forecast_batch error for unfinished items
+
+# Per-stage duration metrics (ForecastStageDuration); bucketed dimensions keep metric cardinality bounded
+STAGE_METRICS_ENABLED = os.environ.get('FORECAST_STAGE_METRICS', 'true').lower() == 'true'
+HISTORY_BUCKETS = ((30, 'lt30d'), (90, '30-90d'), (365, '90-365d'))
+HORIZON_BUCKETS = ((7, 'le7d'), (14, 'le14d'), (30, 'le30d'), (90, 'le90d'))
+
+def bucket_label(value: int, buckets: tuple, overflow: str) -> str:
+    for limit, label in buckets:
+        if value <= limit:
+            return label
+    return overflow
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per forecast stage (prepare, detect, fit,
+    accuracy, predict, postprocess, serialize) and publishes them as
+    ForecastStageDuration metrics. Timing is two perf_counter calls per stage;
+    metrics are only built in emit(). Disabled, every call is a no-op.
+    """
+    
+    def __init__(self, enabled: bool = STAGE_METRICS_ENABLED):
+        self.enabled = enabled
+        self.durations: Dict[str, float] = {}
+    
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+    
+    def record(self, name: str, elapsed_ms: float) -> None:
+        if self.enabled:
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed_ms
+    
+    def emit(self, engine: str, history_length: int, horizon: int) -> None:
+        """One metric per stage, dimensioned by stage, engine, history bucket and horizon bucket"""
+        if not self.enabled or not self.durations:
+            return
+        
+        dimensions = {
+            **metrics.default_dimensions,
+            'engine': engine,
+            'history': bucket_label(history_length, HISTORY_BUCKETS, 'gt365d'),
+            'horizon': bucket_label(horizon, HORIZON_BUCKETS, 'gt90d')
+        }
+        try:
+            for stage, elapsed_ms in self.durations.items():
+                with single_metric(name='ForecastStageDuration', unit=MetricUnit.Milliseconds, value=elapsed_ms,
+                                   namespace=metrics.namespace, default_dimensions=dimensions) as metric:
+                    metric.add_dimension(name='stage', value=stage)
+        except Exception as e:
+            logger.warning(f"Could not emit stage metrics: {str(e)}")
+        finally:
+            self.durations = {}
+
+class StageCostModel:
+    """
+    Estimates forecast stage latency as base + per-row cost, corrected by an
+    exponentially weighted ratio of observed to estimated time. Lives at module
+    level so a warm container calibrates itself to its own CPU and memory size.
+    """
+    # stage: (base ms, ms per row); rows are history rows, or history + horizon for predict
+    PRIORS = {
+        'fit': (300.0, 2.0),
+        'accuracy': (250.0, 1.6),  # Prophet refit on 80% of history
+        'predict_sampling': (80.0, 0.8),
+        'predict_analytic': (15.0, 0.1),
+        'engine': (5.0, 0.05),  # NumPy engine fit + predict
+    }
+    MULTIPLICATIVE_FACTOR = 1.5  # Multiplicative seasonality fits are slower
+    SMOOTHING = 0.3
+    
     def __init__(self):
+        self.scale = {stage: 1.0 for stage in self.PRIORS}
+    
+    def _prior(self, stage: str, rows: int, multiplicative: bool) -> float:
+        base, per_row = self.PRIORS[stage]
+        cost = base + per_row * rows
+        if multiplicative and stage in ('fit', 'accuracy'):
+            cost *= self.MULTIPLICATIVE_FACTOR
+        return cost
+    
+    def estimate(self, stage: str, rows: int, multiplicative: bool = False) -> float:
+        return self._prior(stage, rows, multiplicative) * self.scale[stage]
+    
+    def observe(self, stage: str, rows: int, elapsed_ms: float, multiplicative: bool = False) -> None:
+        ratio = elapsed_ms / self._prior(stage, rows, multiplicative)
+        self.scale[stage] = (1 - self.SMOOTHING) * self.scale[stage] + self.SMOOTHING * ratio
+
+stage_costs = StageCostModel()
+
+# Identical forecast requests arriving concurrently share one computation
+forecast_flight = SingleFlight()
+
+# Holdout scores per product, kept for 'cached' mode within a warm container
+MAX_BACKTEST_SCORES = 10000
+backtest_scores: Dict[str, float] = {}
+
+def record_backtest_score(product_id: str, accuracy: float) -> None:
+    backtest_scores.pop(product_id, None)
+    backtest_scores[product_id] = accuracy
+    if len(backtest_scores) > MAX_BACKTEST_SCORES:
+        backtest_scores.pop(next(iter(backtest_scores)))
+
+def percentage_accuracy(actual: np.ndarray, predicted: np.ndarray) -> float:
+    """100 minus the mean absolute error as a percentage of mean demand, capped to [0, 100]"""
+    import numpy as np
+    
+    mae = np.mean(np.abs(np.asarray(actual, dtype=float) - np.asarray(predicted, dtype=float)))
+    mean_actual = np.mean(actual)
+    
+    # Convert to percentage accuracy
+    accuracy = max(0, 100 - (mae / mean_actual * 100)) if mean_actual > 0 else DEFAULT_ACCURACY
+    
+    return min(100, accuracy)  # Cap at 100%
+
+def extract_model_params(model: Prophet) -> Dict[str, Any]:
+    """
+    Pull the fitted optimizer parameters out of a Prophet model in a
+    JSON-serializable form suitable for warm-starting the next fit
+    """
+    import numpy as np
+    
+    params = {}
+    for name in WARM_START_PARAMS:
+        values = np.asarray(model.params[name])[0]
+        params[name] = float(values) if values.ndim == 0 else values.tolist()
+    return params
+
+class DemandForecaster:
+    def __init__(self, model_store: Optional[Any] = None):
         self.prophet_model = None
         self.historical_data = None
+        self.model_store = model_store  # model_store.ModelStore for fitted-model persistence
+        self.coalesced = False  # Whether the last forecast was served by an identical in-flight request
+        self.stage_timer = StageTimer()
+        self.history_length = 0  # Rows in the last prepared history (metric dimension)
+        self.shadow_observation: Optional[ShadowObservation] = None  # Recorded by the last forecast's shadow run
         
-    def prepare_data(self, historical_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    def prepare_data(self, historical_data: Union[List[Dict[str, Any]], Dict[str, List[Any]]]) -> pd.DataFrame:
         """
         Prepare historical data for Prophet model
         Expected format: [{'date': 'YYYY-MM-DD', 'demand': int, 'price': float, ...}]
+        or columnar, see prepare_columnar_data
         """
+        if isinstance(historical_data, dict):
+            return self.prepare_columnar_data(historical_data)
+        
         try:
-            df = pd.DataFrame(historical_data)
-            
-            # Convert to Prophet format (ds, y)
-            df['ds'] = pd.to_datetime(df['date'])
-            df['y'] = df['demand']
+            # Pivot rows into columns once; everything after works on typed arrays
+            columns = {
+                'dates': [record['date'] for record in historical_data],
+                'demand': [record['demand'] for record in historical_data]
+            }
             
             # Add additional regressors if available
-            if 'price' in df.columns:
-                df['price'] = df['price']
-            if 'promotion' in df.columns:
-                df['promotion'] = df['promotion'].astype(int)
+            if any('price' in record for record in historical_data):
+                columns['price'] = [record.get('price') for record in historical_data]
+            if any('promotion' in record for record in historical_data):
+                columns['promotion'] = [record.get('promotion') for record in historical_data]
                 
-            # Sort by date
-            df = df.sort_values('ds').reset_index(drop=True)
+        except Exception as e:
+            logger.error(f"Error preparing data: {str(e)}")
+            raise ValueError(f"Invalid historical data format: {str(e)}")
+        
+        return self.prepare_columnar_data(columns)
+
+    def prepare_columnar_data(self, columns: Dict[str, List[Any]]) -> pd.DataFrame:
+        """
+        Prepare columnar historical data for Prophet model
+        Expected format: {'dates': [...], 'demand': [...], 'price': [...], 'promotion': [...]}
+        with dates as 'YYYY-MM-DD' strings or integer days since 1970-01-01.
+        Each column maps to one typed NumPy array; no per-row objects are built.
+        The result has one row per calendar day: duplicate dates are merged and
+        missing days are filled (no demand, previous price, no promotion).
+        Missing values (None) in the optional columns are read the same way: no
+        promotion, the nearest known price; a price column with no values is dropped.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        try:
+            # Integers are read as epoch days, strings are parsed as ISO dates, both vectorized
+            dates = np.asarray(columns['dates'])
+            try:
+                days = dates.astype('datetime64[D]')
+            except ValueError:
+                days = pd.to_datetime(dates).to_numpy().astype('datetime64[D]')  # Timestamps with a time part
+            
+            y = np.asarray(columns['demand'], dtype=np.float64)
+            data = {'ds': days.astype('datetime64[ns]'), 'y': y}
+            
+            # Downcast where it loses nothing that matters: demand is exact in float32
+            # below 2**24, prices keep ~7 significant digits, promotion is a flag
+            if not (np.abs(y) >= FLOAT32_EXACT_LIMIT).any():
+                data['y'] = y.astype(np.float32)
+            # float64 first: None becomes NaN there, while integer casts reject it
+            if columns.get('price') is not None:
+                data['price'] = np.asarray(columns['price'], dtype=np.float64).astype(np.float32)
+            if columns.get('promotion') is not None:
+                promotion = np.asarray(columns['promotion'], dtype=np.float64)
+                data['promotion'] = np.nan_to_num(promotion, nan=0).astype(np.int8)
+            
+            lengths = {name: len(values) for name, values in data.items()}
+            if len(set(lengths.values())) > 1:
+                raise ValueError(f"Columns must have equal lengths, got {lengths}")
+            
+            # Sort by date only when it is out of order
+            steps = np.diff(days.astype(np.int64))
+            if (steps < 0).any():
+                order = np.argsort(days, kind='stable')
+                data = {name: values[order] for name, values in data.items()}
+                steps = np.diff(days[order].astype(np.int64))
+            
+            df = pd.DataFrame(data, copy=False)
+            
+            # Several records for one day: total demand, average price, any promotion
+            if (steps == 0).any():
+                aggregations = {'y': 'sum', 'price': 'mean', 'promotion': 'max'}
+                df = df.groupby('ds', sort=False, as_index=False).agg(
+                    {column: how for column, how in aggregations.items() if column in df.columns}
+                )
             
-            return df[['ds', 'y'] + [col for col in df.columns if col not in ['ds', 'y', 'date', 'demand']]]
+            # Days without a record
+            if (steps > 1).any():
+                df = self.fill_missing_days(df)
+            
+            if 'price' in df.columns and df['price'].isna().any():
+                if df['price'].isna().all():
+                    df = df.drop(columns='price')
+                else:
+                    df['price'] = df['price'].ffill().bfill()
+            
+            return df
             
         except Exception as e:
             logger.error(f"Error preparing data: {str(e)}")
             raise ValueError(f"Invalid historical data format: {str(e)}")
 
+    def fill_missing_days(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Reindex a date-sorted frame onto every day between its first and last date"""
+        import pandas as pd
+        
+        dtypes = df.dtypes
+        full_range = pd.date_range(df['ds'].iloc[0], df['ds'].iloc[-1], freq='D', name='ds')
+        df = df.set_index('ds').reindex(full_range)
+        
+        df['y'] = df['y'].fillna(0)
+        if 'price' in df.columns:
+            df['price'] = df['price'].ffill()
+        if 'promotion' in df.columns:
+            df['promotion'] = df['promotion'].fillna(0)
+        
+        return df.reset_index().astype(dtypes, copy=False)
+
     def detect_trend_and_seasonality(self, df: pd.DataFrame) -> tuple:
         """
         Analyze trend and seasonality patterns in the data
         """
+        import pandas as pd
+        
         try:
             # Basic trend analysis
             y_values = df['y'].values
@@ -115,15 +404,23 @@ class DemandForecaster:
             logger.warning(f"Error in trend/seasonality detection: {str(e)}")
             return 'stable', 'low'
 
-    def train_model(self, df: pd.DataFrame, trend: str, seasonality: str) -> Prophet:
+    def train_model(self, df: pd.DataFrame, trend: str, seasonality: str,
+                    init_params: Optional[Dict[str, Any]] = None) -> Prophet:
         """
         Train Prophet model with appropriate parameters
+        init_params: parameters from a previous fit (see extract_model_params) used
+        as the optimizer's starting point; incomplete sets are ignored and a failed
+        warm-started fit is retried from scratch
         """
-        try:
+        import numpy as np
+        from design_cache import CachedDesignProphet
+        
+        def build() -> Prophet:
             # Configure Prophet based on detected patterns
             seasonality_mode = 'multiplicative' if seasonality in ['high', 'medium'] else 'additive'
             
-            model = Prophet(
+            # Fourier features and changepoints are shared by every fit on the same calendar
+            model = CachedDesignProphet(
                 daily_seasonality=False,
                 weekly_seasonality=seasonality != 'none',
                 yearly_seasonality=False,
@@ -137,8 +434,21 @@ class DemandForecaster:
                 model.add_regressor('price')
             if 'promotion' in df.columns:
                 model.add_regressor('promotion')
-                
-            # Fit the model
+            return model
+        
+        try:
+            # Warm-start from the previous optimum only with a complete parameter set;
+            # Prophet indexes every parameter, and a warm start must never cost the forecast
+            if init_params and all(init_params.get(name) is not None for name in WARM_START_PARAMS):
+                try:
+                    init = {name: np.asarray(init_params[name], dtype=float) for name in WARM_START_PARAMS}
+                    model = build()
+                    model.fit(df, init=init)
+                    return model
+                except Exception as e:
+                    logger.warning(f"Warm-started fit failed, fitting from scratch: {str(e)}")
+            
+            model = build()
             model.fit(df)
             
             return model
@@ -147,13 +457,38 @@ class DemandForecaster:
             logger.error(f"Error training model: {str(e)}")
             raise ValueError(f"Model training failed: {str(e)}")
 
-    def calculate_accuracy(self, model: Prophet, historical_df: pd.DataFrame) -> float:
+    def calculate_accuracy(self, model: Any, historical_df: pd.DataFrame, mode: str = ACCURACY_HOLDOUT,
+                           forecast: Optional[pd.DataFrame] = None,
+                           cached_accuracy: Optional[float] = None) -> float:
         """
-        Calculate model accuracy using cross-validation
+        Calculate model accuracy using the requested evaluation mode (see ACCURACY_MODES)
+        Holdout backtests statistical engines with themselves; Prophet models with a fresh Prophet fit
+        forecast: the model's prediction frame including history rows, used by 'cheap'
         """
+        from design_cache import CachedDesignProphet
+        from engines import ForecastEngine
+        
         try:
+            if mode not in ACCURACY_MODES:
+                raise ValueError(f"Unknown accuracy mode: {mode}")
+            
+            if mode == ACCURACY_NONE:
+                return DEFAULT_ACCURACY
+            
+            if mode == ACCURACY_CACHED:
+                if cached_accuracy is not None:
+                    return float(cached_accuracy)
+                mode = ACCURACY_CHEAP
+            
             if len(historical_df) < 14:  # Not enough data for proper validation
-                return 85.0  # Default reasonable accuracy
+                return DEFAULT_ACCURACY  # Default reasonable accuracy
+            
+            if mode == ACCURACY_CHEAP:
+                actual = historical_df['y'].values
+                if forecast is not None:
+                    return percentage_accuracy(actual, forecast['yhat'].values[:len(actual)])
+                # Seasonal-naive error: how well last week's value predicts today's
+                return percentage_accuracy(actual[7:], actual[:-7])
                 
             # Use last 20% of data for validation
             split_point = int(len(historical_df) * 0.8)
@@ -161,113 +496,443 @@ class DemandForecaster:
             test_df = historical_df.iloc[split_point:]
             
             if len(test_df) < 3:  # Not enough test data
-                return 85.0
-            
-            # Train on subset
-            temp_model = Prophet(
-                daily_seasonality=False,
-                weekly_seasonality=True,
-                yearly_seasonality=False,
-                interval_width=0.95
-            )
-            
-            temp_model.fit(train_df)
+                return DEFAULT_ACCURACY
             
-            # Make predictions
-            future = temp_model.make_future_dataframe(periods=len(test_df))
-            forecast = temp_model.predict(future)
+            if isinstance(model, ForecastEngine):
+                forecast = model.forecast(train_df, len(test_df))
+            else:
+                # Train on subset
+                temp_model = CachedDesignProphet(
+                    daily_seasonality=False,
+                    weekly_seasonality=True,
+                    yearly_seasonality=False,
+                    interval_width=0.95,
+                    uncertainty_samples=0  # Only yhat is scored
+                )
+                
+                temp_model.fit(train_df)
+                
+                # Make predictions
+                future = temp_model.make_future_dataframe(periods=len(test_df))
+                forecast = temp_model.predict(future)
             
             # Calculate accuracy
             predicted = forecast.tail(len(test_df))['yhat'].values
             actual = test_df['y'].values
             
-            mae = mean_absolute_error(actual, predicted)
-            mean_actual = np.mean(actual)
+            return percentage_accuracy(actual, predicted)
             
-            # Convert to percentage accuracy
-            accuracy = max(0, 100 - (mae / mean_actual * 100)) if mean_actual > 0 else 85.0
+        except Exception as e:
+            logger.warning(f"Error calculating accuracy: {str(e)}")
+            return DEFAULT_ACCURACY  # Default accuracy
+
+    def load_stored_model(self, product_id: str, watermark: str) -> Optional[Any]:
+        """Load a persisted model for this exact history; storage errors fall back to fitting"""
+        try:
+            return self.model_store.load(product_id, watermark)
+        except Exception as e:
+            logger.warning(f"Error loading stored model for {product_id}: {str(e)}")
+            return None
+
+    def save_stored_model(self, product_id: str, stored: Any) -> None:
+        try:
+            self.model_store.save(product_id, stored)
+        except Exception as e:
+            logger.warning(f"Error saving model for {product_id}: {str(e)}")
+
+    def build_result(self, request: ForecastRequest, dates: np.ndarray, yhat: np.ndarray,
+                     yhat_lower: np.ndarray, yhat_upper: np.ndarray, trend: str, seasonality: str,
+                     accuracy: float, history_length: int, engine: str,
+                     model_params: Optional[Dict[str, Any]] = None,
+                     degraded_stages: Optional[List[str]] = None) -> ForecastResult:
+        """
+        Turn horizon prediction arrays into a ForecastResult with ordering recommendations
+        """
+        from statistics import NormalDist
+        import numpy as np
+        from engines import interval_z
+        
+        today = datetime.now().date()
+        
+        # Whole-array post-processing: truncate and floor predictions, clamp interval ratio
+        yhat = np.asarray(yhat, dtype=float)
+        predicted = np.maximum(np.trunc(yhat), 0).astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(yhat > 0, (np.asarray(yhat_upper) - np.asarray(yhat_lower)) / yhat, 0.8)
+        confidence = np.clip(np.nan_to_num(ratio, nan=0.6), 0.6, 1.0)
+        date_strings = np.datetime_as_string(np.asarray(dates, dtype='datetime64[D]'), unit='D')
+        
+        columns = {'date': date_strings, 'predicted': predicted, 'confidence': confidence}
+        
+        # Quantiles come straight from the interval: recover sigma from its width
+        if request.quantiles:
+            sigma = (np.asarray(yhat_upper) - np.asarray(yhat_lower)) / (2 * interval_z(INTERVAL_WIDTH))
+            for name, q in QUANTILES.items():
+                columns[name] = np.maximum(yhat + NormalDist().inv_cdf(q) * sigma, 0).round(2)
+        
+        # Bulk-convert columns to JSON-ready records
+        names = list(columns)
+        forecast_data = [
+            dict(zip(names, values))
+            for values in zip(*(column.tolist() for column in columns.values()))
+        ]
+        
+        # Calculate recommended order timing and quantity
+        avg_daily_demand = predicted.mean() if len(predicted) else 0.0
+        
+        # Find when to reorder (when stock might run low)
+        next_order_date = (today + timedelta(days=min(14, request.forecast_days // 2))).isoformat()
+        
+        # Recommended quantity (consider lead time and safety stock)
+        lead_time_days = 7  # Assume 1 week lead time
+        safety_factor = 1.2  # 20% safety stock
+        recommended_quantity = int(avg_daily_demand * lead_time_days * safety_factor)
+        
+        # Confidence metrics
+        confidence_metrics = {
+            'overall_confidence': accuracy / 100,
+            'trend_strength': 0.8 if trend != 'stable' else 0.6,
+            'seasonality_strength': {'high': 0.9, 'medium': 0.7, 'low': 0.5, 'none': 0.3}[seasonality],
+            'data_quality': min(1.0, history_length / 30)  # Better with more data
+        }
+        
+        return ForecastResult(
+            product_id=request.product_id,
+            product_name=request.product_name,
+            forecast_data=forecast_data,
+            trend=trend,
+            seasonality=seasonality,
+            accuracy=accuracy,
+            next_order_date=next_order_date,
+            recommended_quantity=max(1, recommended_quantity),
+            confidence_metrics=confidence_metrics,
+            model_params=model_params,
+            engine=engine,
+            degraded_stages=degraded_stages or [],
+            yhat_lower=np.asarray(yhat_lower, dtype=float).tolist(),
+            yhat_upper=np.asarray(yhat_upper, dtype=float).tolist()
+        )
+
+    def add_analytic_intervals(self, forecast: pd.DataFrame, df: pd.DataFrame,
+                               interval_width: float = INTERVAL_WIDTH) -> pd.DataFrame:
+        """
+        Derive yhat_lower/yhat_upper from in-sample residual variance instead of
+        simulation; the band widens with sqrt(1 + h / n) for h days past the history
+        """
+        import numpy as np
+        from engines import interval_z
+        
+        n = len(df)
+        yhat = forecast['yhat'].to_numpy()
+        residuals = df['y'].to_numpy(dtype=float) - yhat[:n]
+        sigma = np.nanstd(residuals, ddof=1) if n > 1 else 0.0
+        
+        steps = np.concatenate([np.zeros(n), np.arange(1, len(yhat) - n + 1)])
+        spread = interval_z(interval_width) * sigma * np.sqrt(1 + steps / n)
+        
+        return forecast.assign(yhat_lower=yhat - spread, yhat_upper=yhat + spread)
+
+    def predict(self, model: Prophet, df: pd.DataFrame, periods: int,
+                interval_mode: str = INTERVAL_ANALYTIC) -> pd.DataFrame:
+        """
+        Predict history plus `periods` future days with a fitted Prophet model
+        """
+        if interval_mode not in INTERVAL_MODES:
+            raise ValueError(f"Unknown interval mode: {interval_mode}")
+        
+        # Sampling simulates ~1000 trend paths per predict; analytic skips it entirely
+        if interval_mode == INTERVAL_ANALYTIC:
+            model.uncertainty_samples = 0
+        else:
+            model.uncertainty_samples = model.uncertainty_samples or PROPHET_UNCERTAINTY_SAMPLES
+        
+        # Generate future predictions
+        future = model.make_future_dataframe(periods=periods)
+        
+        # Add future regressors (assuming stable prices/no promotions)
+        regressors = [col for col in ('price', 'promotion') if col in df.columns]
+        if regressors:
+            future = future.merge(df[['ds'] + regressors], on='ds', how='left')
+        if 'price' in df.columns:
+            last_price = df['price'].iloc[-1]
+            future['price'] = future['price'].fillna(last_price)
+        if 'promotion' in df.columns:
+            future['promotion'] = future['promotion'].fillna(0)
+        
+        forecast = model.predict(future)
+        
+        if interval_mode == INTERVAL_ANALYTIC:
+            forecast = self.add_analytic_intervals(forecast, df)
+        
+        return forecast
+
+    def plan_within_budget(self, remaining_ms: float, rows: int, horizon: int, seasonality: str,
+                           engine_name: str, accuracy_mode: str, interval_mode: str, fitted: bool) -> tuple:
+        """
+        Downgrade stages until the estimated cost fits the remaining budget:
+        sampled intervals -> analytic, holdout accuracy -> cheap, Prophet fit -> Holt-Winters.
+        Returns (engine_name, accuracy_mode, interval_mode, degraded stage names)
+        """
+        from engines import PROPHET, HoltWintersEngine
+        
+        multiplicative = seasonality in ['high', 'medium']
+        degraded = []
+        
+        def estimated_cost() -> float:
+            if engine_name != PROPHET:
+                runs = 2 if accuracy_mode == ACCURACY_HOLDOUT else 1
+                return stage_costs.estimate('engine', rows) * runs
             
-            return min(100, accuracy)  # Cap at 100%
+            cost = stage_costs.estimate(f'predict_{interval_mode}', rows + horizon)
+            if not fitted:
+                cost += stage_costs.estimate('fit', rows, multiplicative)
+                if accuracy_mode == ACCURACY_HOLDOUT:
+                    cost += stage_costs.estimate('accuracy', rows, multiplicative)
+            return cost
+        
+        if estimated_cost() > remaining_ms and interval_mode == INTERVAL_SAMPLING:
+            interval_mode = INTERVAL_ANALYTIC
+            degraded.append('intervals')
+        # A stored fit's holdout score is reused, so its accuracy stage costs nothing
+        accuracy_costs = not (fitted and engine_name == PROPHET)
+        if estimated_cost() > remaining_ms and accuracy_mode == ACCURACY_HOLDOUT and accuracy_costs:
+            accuracy_mode = ACCURACY_CHEAP
+            degraded.append('accuracy')
+        if estimated_cost() > remaining_ms and engine_name == PROPHET and not fitted:
+            engine_name = HoltWintersEngine.name
+            degraded.append('fit')
+        
+        return engine_name, accuracy_mode, interval_mode, degraded
+
+    def run_shadow(self, request: ForecastRequest, df: pd.DataFrame, trend: str, seasonality: str,
+                   primary_engine: str, primary_ms: float, primary_accuracy: float, primary_accuracy_mode: str,
+                   primary_yhat: np.ndarray, remaining_ms: Optional[float] = None) -> Optional[ShadowObservation]:
+        """
+        Run the shadow engine on the same history, backtest it and record latency,
+        memory, accuracy and how far its forecast is from the primary one.
+        Memory is only measured when no other forecast is running in the process:
+        tracemalloc traces every thread, so it would slow their fits and count
+        their allocations.
+        Skipped when it would not fit the remaining budget; never raises.
+        """
+        import tracemalloc
+        import numpy as np
+        from engines import get_engine
+        
+        shadow_engine = shadow_recorder.engine
+        if shadow_engine == primary_engine:
+            return None
+        
+        # Forecast plus holdout backtest
+        if remaining_ms is not None and remaining_ms < 2 * stage_costs.estimate('engine', len(df)):
+            logger.debug(f"Skipping shadow {shadow_engine} for {request.product_id}: {remaining_ms:.0f}ms left")
+            return None
+        
+        tracing = not tracemalloc.is_tracing() and forecast_flight.stats()['in_flight'] <= 1
+        try:
+            if tracing:
+                tracemalloc.start()
+            started = time.perf_counter()
+            
+            engine = get_engine(shadow_engine, trend, seasonality)
+            shadow_yhat = engine.forecast(df, request.forecast_days)['yhat'].values[-request.forecast_days:]
+            shadow_ms = (time.perf_counter() - started) * 1000
+            shadow_accuracy = self.calculate_accuracy(engine, df, ACCURACY_HOLDOUT)
+            
+            peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1) if tracing else None
+            
+            primary_yhat = np.asarray(primary_yhat, dtype=float)
+            scale = max(abs(primary_yhat.mean()), 1e-9)
+            observation = ShadowObservation(
+                product_id=request.product_id,
+                primary_engine=primary_engine,
+                shadow_engine=shadow_engine,
+                primary_ms=round(primary_ms, 2),
+                shadow_ms=round(shadow_ms, 2),
+                shadow_peak_kb=peak_kb,
+                primary_accuracy=float(primary_accuracy),
+                primary_accuracy_mode=primary_accuracy_mode,
+                shadow_accuracy=float(shadow_accuracy),
+                forecast_gap_pct=round(float(np.abs(shadow_yhat - primary_yhat).mean() / scale * 100), 2)
+            )
+            shadow_recorder.record(observation)
+            logger.info("Shadow engine evaluation", extra={'shadow': observation.to_dict()})
+            return observation
             
         except Exception as e:
-            logger.warning(f"Error calculating accuracy: {str(e)}")
-            return 85.0  # Default accuracy
+            logger.warning(f"Shadow engine {shadow_engine} failed for {request.product_id}: {str(e)}")
+            return None
+        finally:
+            if tracing:
+                tracemalloc.stop()
 
-    def generate_forecast(self, request: ForecastRequest) -> ForecastResult:
+    def generate_forecast(self, request: ForecastRequest, budget_ms: Optional[float] = None) -> ForecastResult:
         """
         Generate demand forecast for a product
+        budget_ms: latency budget; stages whose estimated cost would exceed it are
+        downgraded and reported in ForecastResult.degraded_stages
+        Concurrent identical requests wait for one computation and share its
+        (read-only) result; see forecast_flight.stats() for fits saved
         """
+        self.shadow_observation = None
+        result, self.coalesced = forecast_flight.do(
+            request_key(request),
+            lambda: self._generate_forecast(request, budget_ms)
+        )
+        return result
+
+    def _generate_forecast(self, request: ForecastRequest, budget_ms: Optional[float] = None) -> ForecastResult:
+        from engines import PROPHET, get_engine, select_engine
+        from model_cache import CachedFit, fingerprint, model_cache
+        from model_store import StoredModel, data_watermark
+        
+        started = time.perf_counter()
+        timer = self.stage_timer = StageTimer()
+        
         try:
             # Prepare data
-            df = self.prepare_data(request.historical_data)
+            with timer.stage('prepare'):
+                df = self.prepare_data(request.historical_data)
+            self.history_length = len(df)
             
             if len(df) < 7:
                 raise ValueError("Insufficient historical data (minimum 7 data points required)")
             
             # Detect patterns
-            trend, seasonality = self.detect_trend_and_seasonality(df)
+            with timer.stage('detect'):
+                if request.profile:
+                    trend, seasonality = request.profile
+                else:
+                    trend, seasonality = self.detect_trend_and_seasonality(df)
+            multiplicative = seasonality in ['high', 'medium']
             
-            # Train model
-            model = self.train_model(df, trend, seasonality)
+            # Short or simple series go to a NumPy engine; Prophet handles the rest
+            engine_name = request.engine or select_engine(df, trend, seasonality)
+            accuracy_mode = request.accuracy_mode
+            interval_mode = request.interval_mode
+            cached_accuracy = request.cached_accuracy
+            degraded = []
             
-            # Calculate accuracy
-            accuracy = self.calculate_accuracy(model, df)
+            # Reuse a model fitted on identical history in this warm container
+            cache_key = fingerprint(df, trend, seasonality, request.forecast_days, engine_name,
+                                    accuracy_mode, interval_mode)
+            cached = model_cache.get(cache_key)
             
-            # Generate future predictions
-            future = model.make_future_dataframe(periods=request.forecast_days)
+            # A model persisted for this exact history (e.g. by the nightly batch) skips fitting
+            stored = None
+            watermark = None
+            if cached is None and request.engine in (None, PROPHET) and self.model_store is not None:
+                watermark = data_watermark(df)
+                stored = self.load_stored_model(request.product_id, watermark)
             
-            # Add future regressors (assuming stable prices/no promotions)
-            if 'price' in df.columns:
-                last_price = df['price'].iloc[-1]
-                future['price'] = future['price'].fillna(last_price)
-            if 'promotion' in df.columns:
-                future['promotion'] = future['promotion'].fillna(0)
-            
-            forecast = model.predict(future)
+            if cached is None and budget_ms is not None:
+                remaining_ms = budget_ms - (time.perf_counter() - started) * 1000
+                engine_name, accuracy_mode, interval_mode, degraded = self.plan_within_budget(
+                    remaining_ms, len(df), request.forecast_days, seasonality,
+                    engine_name, accuracy_mode, interval_mode, fitted=stored is not None
+                )
+                if degraded:
+                    logger.warning(f"Degrading {', '.join(degraded)} for {request.product_id} "
+                                   f"to fit {remaining_ms:.0f}ms budget")
+                    cache_key = fingerprint(df, trend, seasonality, request.forecast_days, engine_name,
+                                            accuracy_mode, interval_mode)
             
-            # Extract forecast data
-            forecast_data = []
-            today = datetime.now().date()
+            if cached is not None:
+                logger.debug(f"Model cache hit for {request.product_id}")
+                model, forecast = cached.model, cached.forecast
+            elif stored is not None:
+                logger.debug(f"Using stored model for {request.product_id} ({watermark})")
+                model, trend, seasonality, engine_name = stored.model, stored.trend, stored.seasonality, PROPHET
+                stage_start = time.perf_counter()
+                forecast = self.predict(model, df, request.forecast_days, interval_mode)
+                elapsed_ms = (time.perf_counter() - stage_start) * 1000
+                stage_costs.observe(f'predict_{interval_mode}', len(forecast), elapsed_ms)
+                timer.record('predict', elapsed_ms)
+                
+                # The stored holdout score stands in for a refit
+                if accuracy_mode == ACCURACY_HOLDOUT:
+                    accuracy_mode = ACCURACY_CACHED
+                if cached_accuracy is None:
+                    cached_accuracy = stored.accuracy
+            elif engine_name != PROPHET:
+                stage_start = time.perf_counter()
+                model = get_engine(engine_name, trend, seasonality)
+                forecast = model.forecast(df, request.forecast_days)
+                elapsed_ms = (time.perf_counter() - stage_start) * 1000
+                stage_costs.observe('engine', len(df), elapsed_ms)
+                timer.record('fit', elapsed_ms)  # Engines fit and predict in one pass
+            else:
+                # Train model
+                stage_start = time.perf_counter()
+                model = self.train_model(df, trend, seasonality, request.init_params)
+                elapsed_ms = (time.perf_counter() - stage_start) * 1000
+                stage_costs.observe('fit', len(df), elapsed_ms, multiplicative)
+                timer.record('fit', elapsed_ms)
+                
+                stage_start = time.perf_counter()
+                forecast = self.predict(model, df, request.forecast_days, interval_mode)
+                elapsed_ms = (time.perf_counter() - stage_start) * 1000
+                stage_costs.observe(f'predict_{interval_mode}', len(forecast), elapsed_ms)
+                timer.record('predict', elapsed_ms)
             
-            for i, row in forecast.tail(request.forecast_days).iterrows():
-                date = row['ds'].date()
+            if cached is not None and accuracy_mode == ACCURACY_HOLDOUT:
+                accuracy = cached.accuracy  # Backtest of this exact history
+            else:
+                # Calculate accuracy; the other modes are cheap and depend on the request
+                # (cached_accuracy, the latest backtest score), so cache hits recompute them
+                if cached_accuracy is None:
+                    cached_accuracy = backtest_scores.get(request.product_id)
                 
-                forecast_data.append({
-                    'date': date.isoformat(),
-                    'predicted': max(0, int(row['yhat'])),
-                    'confidence': min(1.0, max(0.6, (row['yhat_upper'] - row['yhat_lower']) / row['yhat'] if row['yhat'] > 0 else 0.8))
-                })
+                stage_start = time.perf_counter()
+                accuracy = self.calculate_accuracy(model, df, accuracy_mode, forecast=forecast,
+                                                   cached_accuracy=cached_accuracy)
+                elapsed_ms = (time.perf_counter() - stage_start) * 1000
+                timer.record('accuracy', elapsed_ms)
+                if accuracy_mode == ACCURACY_HOLDOUT:
+                    record_backtest_score(request.product_id, accuracy)
+                    if engine_name == PROPHET:
+                        stage_costs.observe('accuracy', len(df), elapsed_ms, multiplicative)
             
-            # Calculate recommended order timing and quantity
-            avg_daily_demand = np.mean([d['predicted'] for d in forecast_data])
+            if cached is None:
+                # A stored model's fit may be for another engine or mode than this cache key
+                if stored is None:
+                    model_cache.put(cache_key, CachedFit(model=model, forecast=forecast, accuracy=accuracy))
+                
+                if stored is None and engine_name == PROPHET and self.model_store is not None:
+                    self.save_stored_model(request.product_id, StoredModel(
+                        model=model, trend=trend, seasonality=seasonality,
+                        accuracy=accuracy if accuracy_mode == ACCURACY_HOLDOUT else None,
+                        watermark=watermark
+                    ))
             
-            # Find when to reorder (when stock might run low)
-            next_order_date = (today + timedelta(days=min(14, request.forecast_days // 2))).isoformat()
+            self.prophet_model = model if engine_name == PROPHET else None
             
-            # Recommended quantity (consider lead time and safety stock)
-            lead_time_days = 7  # Assume 1 week lead time
-            safety_factor = 1.2  # 20% safety stock
-            recommended_quantity = int(avg_daily_demand * lead_time_days * safety_factor)
+            tail = forecast.tail(request.forecast_days)
             
-            # Confidence metrics
-            confidence_metrics = {
-                'overall_confidence': accuracy / 100,
-                'trend_strength': 0.8 if trend != 'stable' else 0.6,
-                'seasonality_strength': {'high': 0.9, 'medium': 0.7, 'low': 0.5, 'none': 0.3}[seasonality],
-                'data_quality': min(1.0, len(df) / 30)  # Better with more data
-            }
+            # Trial an alternative engine on a sample of traffic; its output is only recorded
+            if cached is None and shadow_recorder.sampled(request.product_id):
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                remaining_ms = None if budget_ms is None else budget_ms - elapsed_ms
+                self.shadow_observation = self.run_shadow(
+                    request, df, trend, seasonality, engine_name, elapsed_ms,
+                    accuracy, accuracy_mode, tail['yhat'].values, remaining_ms
+                )
             
-            return ForecastResult(
-                product_id=request.product_id,
-                product_name=request.product_name,
-                forecast_data=forecast_data,
-                trend=trend,
-                seasonality=seasonality,
-                accuracy=accuracy,
-                next_order_date=next_order_date,
-                recommended_quantity=max(1, recommended_quantity),
-                confidence_metrics=confidence_metrics
-            )
+            with timer.stage('postprocess'):
+                return self.build_result(
+                    request,
+                    dates=tail['ds'].values,
+                    yhat=tail['yhat'].values,
+                    yhat_lower=tail['yhat_lower'].values,
+                    yhat_upper=tail['yhat_upper'].values,
+                    trend=trend,
+                    seasonality=seasonality,
+                    accuracy=accuracy,
+                    history_length=len(df),
+                    engine=engine_name,
+                    model_params=extract_model_params(model) if engine_name == PROPHET else None,
+                    degraded_stages=degraded
+                )
             
         except Exception as e:
             logger.error(f"Error generating forecast: {str(e)}")
@@ -360,6 +1025,93 @@ class RecommendationEngine:
             logger.error(f"Error generating recommendations: {str(e)}")
             return []
 
+def parse_forecast_request(request_data: Dict[str, Any]) -> ForecastRequest:
+    """Build a ForecastRequest from an API payload, applying the API defaults"""
+    return ForecastRequest(
+        product_id=request_data.get('product_id'),
+        product_name=request_data.get('product_name'),
+        historical_data=request_data.get('historical_data', []),
+        forecast_days=request_data.get('forecast_days', 30),
+        engine=request_data.get('engine'),
+        accuracy_mode=request_data.get('accuracy_mode', API_ACCURACY_MODE),
+        interval_mode=request_data.get('interval_mode', INTERVAL_ANALYTIC),
+        quantiles=bool(request_data.get('quantiles', False))
+    )
+
+def forecast_response_data(result: ForecastResult) -> Dict[str, Any]:
+    """API representation of a ForecastResult"""
+    return {
+        'product_id': result.product_id,
+        'product_name': result.product_name,
+        'forecast_data': result.forecast_data,
+        'trend': result.trend,
+        'seasonality': result.seasonality,
+        'accuracy': result.accuracy,
+        'next_order_date': result.next_order_date,
+        'recommended_quantity': result.recommended_quantity,
+        'confidence_metrics': result.confidence_metrics,
+        'engine': result.engine,
+        'degraded_stages': result.degraded_stages
+    }
+
+def available_cpus() -> int:
+    """vCPUs this process may run on (Lambda allocates them in proportion to memory)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def forecast_batch(requests_data: List[Dict[str, Any]], budget_ms: Optional[float] = None) -> tuple:
+    """
+    Forecast several products in parallel on the container's shared FitExecutor:
+    worker processes fed through shared memory where the platform allows them,
+    otherwise a thread per vCPU (Prophet's optimizer runs in a cmdstan subprocess
+    and NumPy releases the GIL, so threads still keep every core busy).
+    Returns (results, errors, fits_saved) where errors are {'product_id', 'error'}
+    dicts and fits_saved counts results served by an identical in-flight request.
+    With a budget, items still unfinished when it runs out are reported as
+    BATCH_TIMED_OUT errors so the items that did finish are still returned.
+    """
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+    from fit_executor import shared_fit_executor
+    
+    deadline = time.time() + budget_ms / 1000 if budget_ms is not None else None
+    executor = shared_fit_executor(int(os.environ.get('FORECAST_BATCH_WORKERS', 0)) or None)
+    
+    results = []
+    errors = []
+    futures = []
+    fits_saved = 0
+    
+    for request_data in requests_data:
+        if not isinstance(request_data, dict):
+            logger.warning(f"Skipping malformed forecast_batch entry: {type(request_data).__name__}")
+            errors.append({'product_id': None, 'error': 'Each request must be a JSON object'})
+            continue
+        
+        product_id = request_data.get('product_id')
+        try:
+            request = parse_forecast_request(request_data)
+            futures.append((product_id, executor.submit(request, deadline=deadline, emit_metrics=True)))
+        except Exception as e:
+            logger.warning(f"Forecast failed for {product_id}: {str(e)}")
+            errors.append({'product_id': product_id, 'error': str(e)})
+    
+    for product_id, future in futures:
+        try:
+            outcome = future.result(timeout=None if deadline is None else max(0.0, deadline - time.time()))
+            results.append(outcome.result)
+            fits_saved += outcome.coalesced
+        except FutureTimeoutError:
+            future.cancel()  # Queued fits never start; a running one finishes unobserved
+            logger.warning(f"Forecast for {product_id} did not finish before the deadline")
+            errors.append({'product_id': product_id, 'error': BATCH_TIMED_OUT})
+        except Exception as e:
+            logger.warning(f"Forecast failed for {product_id}: {str(e)}")
+            errors.append({'product_id': product_id, 'error': str(e)})
+    
+    return results, errors, fits_saved
+
 @tracer.capture_lambda_handler
 @logger.inject_lambda_context(correlation_id_path=correlation_paths.API_GATEWAY_REST)
 @metrics.log_metrics(capture_cold_start_metric=True)
@@ -374,21 +1126,67 @@ def lambda_handler(event, context):
         body = json.loads(event.get('body', '{}')) if isinstance(event.get('body'), str) else event.get('body', {})
         action = body.get('action', 'forecast')
         
+        # Leave headroom under the Lambda timeout for serializing the response
+        budget_ms = None
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            budget_ms = context.get_remaining_time_in_millis() - RESPONSE_RESERVE_MS
+        
         if action == 'forecast':
             # Handle forecast request
-            request_data = body.get('data', {})
+            forecast_request = parse_forecast_request(body.get('data', {}))
             
-            forecast_request = ForecastRequest(
-                product_id=request_data.get('product_id'),
-                product_name=request_data.get('product_name'),
-                historical_data=request_data.get('historical_data', []),
-                forecast_days=request_data.get('forecast_days', 30)
-            )
+            from model_store import default_model_store
             
-            forecaster = DemandForecaster()
-            result = forecaster.generate_forecast(forecast_request)
+            forecaster = DemandForecaster(model_store=default_model_store())
+            result = forecaster.generate_forecast(forecast_request, budget_ms=budget_ms)
             
             metrics.add_metric(name="ForecastGenerated", unit=MetricUnit.Count, value=1)
+            if forecaster.coalesced:
+                metrics.add_metric(name="ForecastFitsSaved", unit=MetricUnit.Count, value=1)
+            
+            timer = forecaster.stage_timer
+            with timer.stage('serialize'):
+                response_body = json.dumps({
+                    'success': True,
+                    'data': forecast_response_data(result)
+                }, default=str)
+            if not forecaster.coalesced:
+                timer.emit(result.engine, forecaster.history_length, forecast_request.forecast_days)
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': response_body
+            }
+            
+        elif action == 'forecast_batch':
+            # Handle multi-product forecast request; per-product failures don't fail the call
+            requests_data = body.get('data', {}).get('requests', [])
+            
+            if not isinstance(requests_data, list) or not requests_data:
+                raise ValueError("forecast_batch requires a non-empty 'requests' list")
+            if len(requests_data) > MAX_BATCH_REQUESTS:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'success': False,
+                        'error': f'Too many requests in batch: {len(requests_data)} (max {MAX_BATCH_REQUESTS})'
+                    })
+                }
+            
+            results, errors, fits_saved = forecast_batch(requests_data, budget_ms=budget_ms)
+            
+            metrics.add_metric(name="ForecastGenerated", unit=MetricUnit.Count, value=len(results))
+            metrics.add_metric(name="ForecastFailed", unit=MetricUnit.Count, value=len(errors))
+            metrics.add_metric(name="ForecastFitsSaved", unit=MetricUnit.Count, value=fits_saved)
+            logger.info("Forecast coalescing", extra={"forecast_flight": forecast_flight.stats()})
             
             return {
                 'statusCode': 200,
@@ -399,15 +1197,12 @@ def lambda_handler(event, context):
                 'body': json.dumps({
                     'success': True,
                     'data': {
-                        'product_id': result.product_id,
-                        'product_name': result.product_name,
-                        'forecast_data': result.forecast_data,
-                        'trend': result.trend,
-                        'seasonality': result.seasonality,
-                        'accuracy': result.accuracy,
-                        'next_order_date': result.next_order_date,
-                        'recommended_quantity': result.recommended_quantity,
-                        'confidence_metrics': result.confidence_metrics
+                        'results': [forecast_response_data(result) for result in results],
+                        'errors': errors,
+                        'total': len(requests_data),
+                        'succeeded': len(results),
+                        'failed': len(errors),
+                        'timed_out': sum(error['error'] == BATCH_TIMED_OUT for error in errors)
                     }
                 }, default=str)
             }
@@ -442,7 +1237,7 @@ def lambda_handler(event, context):
                 },
                 'body': json.dumps({
                     'success': False,
-                    'error': f'Invalid action: {action}. Supported actions: forecast, recommendations'
+                    'error': f'Invalid action: {action}. Supported actions: forecast, forecast_batch, recommendations'
                 })
             }
             
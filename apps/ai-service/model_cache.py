@@ -0,0 +1,127 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('FORECAST_MODEL_CACHE_SIZE', '64'))
+DEFAULT_MAX_BYTES = int(os.environ.get('FORECAST_MODEL_CACHE_MB', '256')) * 1024 * 1024
+
+
+@dataclass
+class CachedFit:
+    """Fitted model plus everything derived from it for one cache key"""
+    model: Any
+    forecast: pd.DataFrame
+    accuracy: float  # Reused on hits only for holdout; the other accuracy modes are recomputed per request
+    size_bytes: int = 0
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+def fingerprint(df: pd.DataFrame, *parts: Any) -> str:
+    """
+    Content hash of a prepared DataFrame plus any extra key parts
+    (trend, seasonality, horizon, ...)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(','.join(df.columns).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    for part in parts:
+        digest.update(b'|')
+        digest.update(str(part).encode())
+    return digest.hexdigest()
+
+
+def estimate_size(entry: CachedFit) -> int:
+    """Approximate resident size of a cached fit in bytes"""
+    size = int(entry.forecast.memory_usage(deep=True).sum())
+
+    history = getattr(entry.model, 'history', None)
+    if isinstance(history, pd.DataFrame):
+        size += int(history.memory_usage(deep=True).sum())
+
+    params = getattr(entry.model, 'params', None) or {}
+    for value in params.values():
+        if isinstance(value, np.ndarray):
+            size += value.nbytes
+
+    return size
+
+
+class ModelCache:
+    """
+    LRU cache of fitted forecast models, bounded by entry count and memory.
+    Lives at module level so warm Lambda containers reuse it across invocations.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, CachedFit]' = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedFit]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedFit) -> None:
+        if self.max_entries <= 0:
+            return
+
+        entry.size_bytes = entry.size_bytes or estimate_size(entry)
+        if entry.size_bytes > self.max_bytes:
+            return  # Would evict everything else and still not fit
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._stats.size_bytes -= previous.size_bytes
+
+            self._entries[key] = entry
+            self._stats.size_bytes += entry.size_bytes
+
+            while len(self._entries) > self.max_entries or self._stats.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._stats.size_bytes -= evicted.size_bytes
+                self._stats.evictions += 1
+
+            self._stats.entries = len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return self._stats.to_dict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared across warm invocations of the same container
+model_cache = ModelCache()
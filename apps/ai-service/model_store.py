@@ -0,0 +1,214 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+from urllib.parse import quote
+
+import pandas as pd
+
+from model_cache import fingerprint
+
+DEFAULT_LOCAL_PATH = os.path.join(tempfile.gettempdir(), 'omnix-models')
+# Size cap of the container-local store (/tmp is shared with everything else); 0 disables it
+LOCAL_STORE_MAX_BYTES = int(os.environ.get('MODEL_STORE_MAX_MB', '256')) * 1024 * 1024
+LOCAL_STORE_CHECK_FRACTION = 0.1  # Re-check the store's size after writing this share of the cap
+MODEL_SUFFIX = '.json.gz'
+
+
+@dataclass
+class StoredModel:
+    """A fitted Prophet model plus what the forecaster needs to skip refitting"""
+    model: Any
+    trend: str
+    seasonality: str
+    accuracy: Optional[float]
+    watermark: str
+    created_at: str = ''
+
+
+def data_watermark(df: pd.DataFrame) -> str:
+    """
+    The last day of history a model was fitted on plus a digest of that
+    history, so a model is only reused for exactly the data it was fitted on:
+    a same-day rerun with corrected demand or a different window refits.
+    """
+    return f"{pd.Timestamp(df['ds'].iloc[-1]).date().isoformat()}-{fingerprint(df)[:16]}"
+
+
+def serialize_model(stored: StoredModel) -> bytes:
+    from prophet.serialize import model_to_json
+
+    payload = {
+        'model': model_to_json(stored.model),
+        'trend': stored.trend,
+        'seasonality': stored.seasonality,
+        'accuracy': stored.accuracy,
+        'watermark': stored.watermark,
+        'created_at': stored.created_at or datetime.now().isoformat()
+    }
+    return gzip.compress(json.dumps(payload).encode(), compresslevel=6)
+
+
+def deserialize_model(data: bytes) -> StoredModel:
+    from prophet.serialize import model_from_json
+
+    payload = json.loads(gzip.decompress(data))
+    return StoredModel(
+        model=model_from_json(payload['model']),
+        trend=payload['trend'],
+        seasonality=payload['seasonality'],
+        accuracy=payload.get('accuracy'),
+        watermark=payload['watermark'],
+        created_at=payload.get('created_at', '')
+    )
+
+
+class BlobClient:
+    """Minimal key/value blob interface a model store can sit on (S3, GCS, ...)"""
+
+    def put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+
+class FilesystemBlobClient(BlobClient):
+    """Blob client backed by a directory; stands in for a real blob store (or a shared EFS mount)"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, *key.split('/')))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Blob key resolves outside the store root: {key}")
+        return path
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+
+class ModelStore:
+    """Persists fitted models keyed by product and data watermark"""
+
+    def save(self, product_id: str, stored: StoredModel) -> None:
+        raise NotImplementedError
+
+    def load(self, product_id: str, watermark: str) -> Optional[StoredModel]:
+        raise NotImplementedError
+
+    @staticmethod
+    def key(product_id: str, watermark: str) -> str:
+        # Product ids come from API payloads: encode separators and dots so an id is always one plain key segment
+        return f"{quote(str(product_id), safe='').replace('.', '%2E')}/{watermark}{MODEL_SUFFIX}"
+
+
+class BlobModelStore(ModelStore):
+    """Model store on top of any BlobClient"""
+
+    def __init__(self, client: BlobClient, prefix: str = 'models'):
+        self.client = client
+        self.prefix = prefix
+
+    def _blob_key(self, product_id: str, watermark: str) -> str:
+        key = self.key(product_id, watermark)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def save(self, product_id: str, stored: StoredModel) -> None:
+        self.client.put(self._blob_key(product_id, stored.watermark), serialize_model(stored))
+
+    def load(self, product_id: str, watermark: str) -> Optional[StoredModel]:
+        data = self.client.get(self._blob_key(product_id, watermark))
+        return deserialize_model(data) if data is not None else None
+
+
+class LocalModelStore(BlobModelStore):
+    """
+    Model store in the container's local /tmp; survives only as long as the warm
+    container. Kept under `max_bytes` by deleting the oldest models; the size is
+    re-checked from disk every LOCAL_STORE_CHECK_FRACTION of the cap written,
+    so models written by other worker processes are counted too.
+    """
+
+    def __init__(self, path: str = DEFAULT_LOCAL_PATH, max_bytes: Optional[int] = None):
+        super().__init__(FilesystemBlobClient(path), prefix='')
+        self.path = path
+        self.max_bytes = LOCAL_STORE_MAX_BYTES if max_bytes is None else max_bytes
+        self._written = 0  # Bytes saved since the last size check
+        self._lock = threading.Lock()
+
+    def save(self, product_id: str, stored: StoredModel) -> None:
+        data = serialize_model(stored)
+        self.client.put(self._blob_key(product_id, stored.watermark), data)
+        if self.max_bytes <= 0:
+            return
+
+        with self._lock:
+            self._written += len(data)
+            if self._written < self.max_bytes * LOCAL_STORE_CHECK_FRACTION:
+                return
+            self._written = 0
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete the oldest models until the store fits in max_bytes; returns how many were deleted"""
+        models = []
+        for directory, _, names in os.walk(self.path):
+            for name in names:
+                if not name.endswith(MODEL_SUFFIX):
+                    continue  # Skip writes still in progress
+                path = os.path.join(directory, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                models.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for _, size, _ in models)
+        deleted = 0
+        for _, size, path in sorted(models):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass  # Another worker got there first
+            total -= size
+        return deleted
+
+
+def default_model_store() -> Optional[ModelStore]:
+    """
+    Build the store selected by MODEL_STORE_BACKEND:
+    'none' (default), 'local' (/tmp) or 'filesystem' (blob stand-in rooted at MODEL_STORE_PATH)
+    """
+    backend = os.environ.get('MODEL_STORE_BACKEND', 'none')
+
+    if backend == 'local':
+        return LocalModelStore(os.environ.get('MODEL_STORE_PATH', DEFAULT_LOCAL_PATH))
+    if backend == 'filesystem':
+        return BlobModelStore(FilesystemBlobClient(os.environ['MODEL_STORE_PATH']))
+    if backend != 'none':
+        raise ValueError(f"Unknown model store backend: {backend}")
+    return None
@@ -0,0 +1,167 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from batch_engine import profile_histories
+from fit_executor import FitExecutor, fit_workers as size_fit_workers
+from prefetch import HistoryPrefetcher
+
+FETCH_WORKERS = int(os.environ.get('PIPELINE_FETCH_WORKERS', 0)) or None  # None: HISTORY_PREFETCH_WORKERS
+FETCH_DEPTH = int(os.environ.get('PIPELINE_FETCH_DEPTH', 0)) or None  # None: 4x fetch workers
+FIT_WORKERS = int(os.environ.get('PIPELINE_FIT_WORKERS', 0)) or None  # None: vCPUs, capped by Lambda memory
+FIT_DEPTH = int(os.environ.get('PIPELINE_FIT_DEPTH', 0)) or None  # None: 2x fit workers
+DRAIN_SECONDS = float(os.environ.get('PIPELINE_DRAIN_SECONDS', '60'))
+PROFILE_BATCH_SIZE = 256  # Most fetched histories profiled together in one vectorized pass
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StageCounter:
+    """Items through one pipeline stage (failures included) and when the first and last of them finished"""
+    items: int = 0
+    failed: int = 0
+    first: Optional[float] = None
+    last: Optional[float] = None
+
+    def add(self, items: int = 1, failed: int = 0) -> None:
+        now = time.perf_counter()
+        self.first = now if self.first is None else self.first
+        self.last = now
+        self.items += items
+        self.failed += failed
+
+    def report(self, started: float) -> Dict[str, Any]:
+        elapsed = (self.last - started) if self.last is not None else 0.0
+        return {
+            'items': self.items,
+            'failed': self.failed,
+            'per_second': round(self.items / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+
+@dataclass
+class PipelineStats:
+    started: float = field(default_factory=time.perf_counter)
+    stages: Dict[str, StageCounter] = field(default_factory=lambda: {
+        name: StageCounter() for name in ('discover', 'fetch', 'fit', 'write')
+    })
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {name: counter.report(self.started) for name, counter in self.stages.items()}
+
+
+class ForecastPipeline:
+    """
+    Per-product batch forecasting as a streaming pipeline:
+    discover (parallel scan) -> fetch (history and previous forecast, threads)
+    -> fit (FitExecutor worker processes) -> write (background batch writer).
+    Each hand-off is bounded - fetches in flight, fits in flight and the writer's
+    buffer - so a slow stage holds back the ones before it instead of growing
+    memory. When the Lambda's remaining time drops under `drain_seconds`, no new
+    products are started; fits in flight finish and are written, the rest
+    already discovered are reported as skipped. If the scan had not finished,
+    the run reports catalog_complete False: total_products is then only what
+    was discovered, not the catalog size.
+    """
+
+    def __init__(self, processor, context=None, fetch_workers: Optional[int] = None,
+                 fetch_depth: Optional[int] = None, fit_workers: Optional[int] = None,
+                 fit_depth: Optional[int] = None, drain_seconds: Optional[float] = None):
+        self.processor = processor
+        self.context = context
+        self.fetch_workers = fetch_workers or FETCH_WORKERS
+        self.fetch_depth = fetch_depth or FETCH_DEPTH
+        self.fit_workers = size_fit_workers(fit_workers or FIT_WORKERS)
+        self.fit_depth = max(self.fit_workers, fit_depth or FIT_DEPTH or self.fit_workers * 2)
+        self.drain_seconds = DRAIN_SECONDS if drain_seconds is None else drain_seconds
+        self.stats = PipelineStats()
+        self.catalog_complete = False
+
+    def time_is_low(self) -> bool:
+        if self.context is None or not hasattr(self.context, 'get_remaining_time_in_millis'):
+            return False
+        return self.context.get_remaining_time_in_millis() < self.drain_seconds * 1000
+
+    def discovered(self, products: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for product in products:
+            self.stats.stages['discover'].add()
+            yield product
+        self.catalog_complete = True  # The source ran to the end
+
+    def run(self, products: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Forecast and save every product (default: all active products, streamed from the scan)"""
+        processor = self.processor
+        stages = self.stats.stages
+        source = processor.iter_active_products() if products is None else iter(products)
+        prefetcher = HistoryPrefetcher(processor.fetch_inputs, self.discovered(source),
+                                       self.fetch_workers, self.fetch_depth)
+        fits: Dict[Future, Dict[str, Any]] = {}
+        drained = False
+
+        def collect(block: bool) -> None:
+            done, _ = wait(fits, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                product = fits.pop(future)
+                try:
+                    result = future.result().result
+                except Exception as e:
+                    logger.error(f"Error processing forecast for product {product['product_id']}: {str(e)}")
+                    stages['fit'].add(failed=1)
+                    continue
+                stages['fit'].add()
+
+                saved = processor.save_forecast(product['product_id'], processor.to_forecast_data(result))
+                stages['write'].add(failed=0 if saved else 1)
+
+        logger.info(f"Pipeline: {self.fit_workers} fit workers, {self.fit_depth} fits in flight")
+        executor = FitExecutor(self.fit_workers)
+        try:
+            batches = prefetcher.batches(PROFILE_BATCH_SIZE)
+            for batch in batches:
+                stages['fetch'].add(len(batch))
+                histories = {product['product_id']: history for product, (history, _) in batch}
+                profiles = profile_histories(histories)
+
+                for product, (history, previous) in batch:
+                    if self.time_is_low():
+                        drained = True
+                        break
+
+                    request = processor.build_request(product, history, profiles.get(product['product_id']), previous)
+                    if request is None:
+                        stages['fit'].add(failed=1)
+                        continue
+
+                    while len(fits) >= self.fit_depth:
+                        collect(block=True)  # Backpressure: fetching waits for the fit stage
+                    fits[executor.submit(request)] = product
+
+                collect(block=False)
+                if drained:
+                    # Cancel queued fetches and stop the scan
+                    batches.close()
+                    if hasattr(source, 'close'):
+                        source.close()
+                    logger.warning(f"Lambda time is running low, draining {len(fits)} fits in flight")
+                    break
+
+            while fits:
+                collect(block=True)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        discover, fit, write = stages['discover'], stages['fit'], stages['write']
+        return {
+            'processed': write.items - write.failed,
+            'failed': fit.failed + write.failed,
+            # Discovered but never fitted because of the drain; products the stopped scan
+            # never reached are in neither count, and catalog_complete is False
+            'skipped': discover.items - fit.items,
+            'total_products': discover.items,
+            'catalog_complete': self.catalog_complete,
+            'drained': drained,
+            'stages': self.stats.report()
+        }
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+HISTORY_PREFETCH_WORKERS = int(os.environ.get('HISTORY_PREFETCH_WORKERS', '8'))
+
+History = List[Dict[str, Any]]
+
+
+class HistoryPrefetcher:
+    """
+    Fetches product histories ahead of the consumer on a bounded thread pool
+    and hands them over in arrival order, so history queries overlap with fits.
+    At most `depth` fetches are in flight or waiting to be consumed.
+    `fetch` is called from worker threads and must be thread-safe.
+    """
+
+    def __init__(self, fetch: Callable[[str], History], products: Iterable[Dict[str, Any]],
+                 workers: Optional[int] = None, depth: Optional[int] = None):
+        self.fetch = fetch
+        self.workers = max(1, workers or HISTORY_PREFETCH_WORKERS)
+        self.depth = max(self.workers, depth or self.workers * 4)
+        self._products = iter(products)
+
+    def batches(self, max_size: Optional[int] = None) -> Iterator[List[Tuple[Dict[str, Any], History]]]:
+        """
+        Yield lists of (product, history): waits for the next history, then takes
+        every other one that has already arrived (up to max_size)
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='history') as executor:
+            pending: Dict[Future, Dict[str, Any]] = {}
+
+            def top_up() -> None:
+                while len(pending) < self.depth:
+                    product = next(self._products, None)
+                    if product is None:
+                        return
+                    pending[executor.submit(self.fetch, product['product_id'])] = product
+
+            try:
+                top_up()
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    batch = [(pending.pop(future), future.result()) for future in list(done)[:max_size]]
+                    top_up()  # Keep fetching while the consumer works on this batch
+                    yield batch
+            finally:
+                # Consumer stopped early (or a fetch raised): drop fetches that have not started
+                for future in pending:
+                    future.cancel()
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, Any], History]]:
+        for batch in self.batches():
+            yield from batch
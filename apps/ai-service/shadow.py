@@ -0,0 +1,89 @@
+import hashlib
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+SHADOW_ENGINE = os.environ.get('SHADOW_ENGINE', '')
+SHADOW_FRACTION = float(os.environ.get('SHADOW_FRACTION', '0'))
+
+
+@dataclass
+class ShadowObservation:
+    """One shadow run next to a primary forecast; never part of the response"""
+    product_id: str
+    primary_engine: str
+    shadow_engine: str
+    primary_ms: float
+    shadow_ms: float
+    shadow_peak_kb: Optional[float]  # Python allocations during the shadow run; None when other forecasts were running
+    primary_accuracy: float
+    primary_accuracy_mode: str  # Only 'holdout' scores are directly comparable with shadow_accuracy
+    shadow_accuracy: float  # Holdout backtest
+    forecast_gap_pct: float  # Mean absolute difference between the two horizons, % of the primary mean
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ShadowRecorder:
+    """
+    Decides which forecasts also run the shadow engine and aggregates what the
+    shadow runs observed, per (primary, shadow) engine pair.
+    Sampling hashes the product id, so a product is consistently in or out.
+    """
+
+    def __init__(self, engine: Optional[str] = None, fraction: Optional[float] = None):
+        self.engine = SHADOW_ENGINE if engine is None else engine
+        self.fraction = SHADOW_FRACTION if fraction is None else fraction
+        self._totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def sampled(self, product_id: str) -> bool:
+        if not self.engine or self.fraction <= 0:
+            return False
+        bucket = int.from_bytes(hashlib.blake2b(str(product_id).encode(), digest_size=8).digest(), 'big')
+        return bucket / 2 ** 64 < self.fraction
+
+    def record(self, observation: ShadowObservation) -> None:
+        key = (observation.primary_engine, observation.shadow_engine)
+        with self._lock:
+            totals = self._totals.setdefault(key, {
+                'runs': 0, 'primary_ms': 0.0, 'shadow_ms': 0.0, 'shadow_accuracy': 0.0, 'forecast_gap_pct': 0.0,
+                'memory_runs': 0, 'shadow_peak_kb': 0.0,
+                'holdout_runs': 0, 'primary_holdout_accuracy': 0.0
+            })
+            totals['runs'] += 1
+            for name in ('primary_ms', 'shadow_ms', 'shadow_accuracy', 'forecast_gap_pct'):
+                totals[name] += getattr(observation, name)
+            if observation.shadow_peak_kb is not None:
+                totals['memory_runs'] += 1
+                totals['shadow_peak_kb'] += observation.shadow_peak_kb
+            if observation.primary_accuracy_mode == 'holdout':
+                totals['holdout_runs'] += 1
+                totals['primary_holdout_accuracy'] += observation.primary_accuracy
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Mean latency, memory, accuracy and forecast gap per 'primary->shadow' pair"""
+        summary = {}
+        with self._lock:
+            for (primary, shadow), totals in self._totals.items():
+                runs = totals['runs']
+                pair = {name: round(totals[name] / runs, 3) for name in
+                        ('primary_ms', 'shadow_ms', 'shadow_accuracy', 'forecast_gap_pct')}
+                pair['runs'] = runs
+                if totals['memory_runs']:
+                    pair['shadow_peak_kb'] = round(totals['shadow_peak_kb'] / totals['memory_runs'], 3)
+                if totals['holdout_runs']:
+                    pair['primary_holdout_accuracy'] = round(
+                        totals['primary_holdout_accuracy'] / totals['holdout_runs'], 3)
+                summary[f"{primary}->{shadow}"] = pair
+        return summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+# Shared across warm invocations of the same container
+shadow_recorder = ShadowRecorder()
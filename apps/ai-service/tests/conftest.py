@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The service is a flat set of modules, deployed without a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('POWERTOOLS_TRACE_DISABLED', '1')
+os.environ.setdefault('POWERTOOLS_METRICS_NAMESPACE', 'omnix-tests')
+
+
+def daily_history(days, seed=0, level=40.0, weekly=10.0, regressors=False, start='2025-01-01'):
+    """Rows of daily demand in the request format: level + weekly cycle + noise (+ price/promotion)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    demand = level + weekly * np.sin(2 * np.pi * t / 7) + rng.normal(0, 2, days)
+    dates = np.datetime64(start) + t
+
+    rows = []
+    for index in range(days):
+        row = {'date': str(dates[index]), 'demand': float(max(demand[index], 0))}
+        if regressors:
+            row['price'] = float(10 + rng.integers(0, 3))
+            row['promotion'] = int(rng.random() < 0.2)
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture
+def history():
+    return daily_history
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    """Warm-container state is module level; every test starts cold"""
+    from model_cache import model_cache
+    model_cache.clear()
+    yield
+    model_cache.clear()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines import HoltWintersEngine
+from lambda_function import (DEFAULT_ACCURACY, DemandForecaster, ForecastRequest, backtest_scores,
+                             percentage_accuracy)
+
+
+@pytest.fixture
+def forecaster():
+    return DemandForecaster()
+
+
+@pytest.fixture
+def df(forecaster, history):
+    return forecaster.prepare_data(history(70, seed=3))
+
+
+def test_none_reports_default(forecaster, df):
+    assert forecaster.calculate_accuracy(None, df, 'none') == DEFAULT_ACCURACY
+
+
+def test_unknown_mode_falls_back_to_default(forecaster, df):
+    assert forecaster.calculate_accuracy(None, df, 'bogus') == DEFAULT_ACCURACY
+
+
+def test_cheap_scores_the_in_sample_forecast(forecaster, df):
+    forecast = pd.DataFrame({'yhat': np.concatenate([df['y'].to_numpy() * 1.1, np.zeros(7)])})
+
+    assert forecaster.calculate_accuracy(None, df, 'cheap', forecast=forecast) == pytest.approx(90.0, abs=1e-3)
+
+
+def test_cheap_without_forecast_scores_seasonal_naive(forecaster):
+    weekly = {'dates': list(range(20089, 20089 + 28)), 'demand': [10, 20, 30, 40, 50, 60, 70] * 4}
+
+    assert forecaster.calculate_accuracy(None, forecaster.prepare_data(weekly), 'cheap') == 100.0
+
+
+def test_cached_uses_the_given_score_or_falls_back_to_cheap(forecaster, df):
+    assert forecaster.calculate_accuracy(None, df, 'cached', cached_accuracy=61.5) == 61.5
+    assert forecaster.calculate_accuracy(None, df, 'cached') == forecaster.calculate_accuracy(None, df, 'cheap')
+
+
+@pytest.mark.parametrize('mode', ['cheap', 'holdout'])
+def test_short_history_reports_default(forecaster, history, mode):
+    df = forecaster.prepare_data(history(13))
+
+    assert forecaster.calculate_accuracy(HoltWintersEngine(), df, mode) == DEFAULT_ACCURACY
+
+
+def test_holdout_backtests_engines_with_themselves(forecaster, df):
+    engine = HoltWintersEngine('stable', 'high')
+    split = int(len(df) * 0.8)
+    expected = percentage_accuracy(df['y'].to_numpy()[split:],
+                                   engine.forecast(df.iloc[:split], len(df) - split)['yhat'].to_numpy()[split:])
+
+    assert forecaster.calculate_accuracy(engine, df, 'holdout') == pytest.approx(expected)
+
+
+def test_holdout_refits_prophet(forecaster, df):
+    accuracy = forecaster.calculate_accuracy(object(), df, 'holdout')  # Any non-engine model means Prophet
+
+    assert 80 < accuracy <= 100
+    assert accuracy != DEFAULT_ACCURACY
+
+
+def test_holdout_score_feeds_cached_mode(history):
+    backtest_scores.clear()
+    rows = history(60, seed=4)
+
+    holdout = DemandForecaster().generate_forecast(ForecastRequest('p1', 'Product', rows, accuracy_mode='holdout'))
+    cached = DemandForecaster().generate_forecast(ForecastRequest('p1', 'Product', rows[:-1], accuracy_mode='cached'))
+
+    assert backtest_scores['p1'] == holdout.accuracy
+    assert cached.accuracy == holdout.accuracy
+    backtest_scores.clear()
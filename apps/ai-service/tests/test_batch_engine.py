@@ -0,0 +1,71 @@
+import numpy as np
+
+from batch_engine import detect_profiles, forecast_many, profile_histories, stack_histories
+
+
+def ramp(days, slope, start='2025-01-01'):
+    dates = np.datetime64(start) + np.arange(days)
+    return [{'date': str(date), 'demand': 20 + slope * index} for index, date in enumerate(dates)]
+
+
+def test_detect_profiles_labels(history):
+    histories = {
+        'weekly': history(84, seed=1, weekly=15.0),
+        'flat': history(84, seed=2, weekly=0.0),
+        'rising': ramp(60, 1.0),
+        'falling': ramp(60, -1.0),
+        'short_span': history(21, seed=3, weekly=15.0),
+        'tiny': history(5, seed=4),
+    }
+    stacked = stack_histories(histories)
+
+    labels = dict(zip(stacked.product_ids, zip(*detect_profiles(stacked))))
+
+    assert labels['weekly'][1] == 'high'
+    assert labels['flat'][1] == 'none'
+    assert labels['rising'][0] == 'increasing'
+    assert labels['falling'][0] == 'decreasing'
+    assert labels['short_span'][1] == 'low'  # Under four weeks, like the per-product detector
+    assert labels['tiny'] == ('stable', 'none')
+
+
+def test_detect_profiles_ignores_other_rows_dates(history):
+    alone = stack_histories({'p': history(84, seed=1)})
+    mixed = stack_histories({'p': history(84, seed=1), 'late': history(30, seed=2, start='2025-06-01')})
+
+    assert detect_profiles(alone)[1][0] == dict(zip(mixed.product_ids, detect_profiles(mixed)[1]))['p']
+
+
+def test_profile_histories_is_independent_of_chunking(history):
+    histories = {f'p{index}': history(40 + index * 7, seed=index, weekly=index * 2.0) for index in range(7)}
+
+    assert profile_histories(histories, chunk_size=2) == profile_histories(histories)
+
+
+def test_forecast_many_uses_detect_profiles_labels(history):
+    histories = {f'p{index}': history(70, seed=index, weekly=index * 3.0) for index in range(6)}
+    histories['rising'] = ramp(70, 0.5)
+
+    results = forecast_many(histories, {}, horizon=7)
+    profiles = profile_histories(histories)
+
+    assert {pid: (result.trend, result.seasonality) for pid, result in results.items()} == profiles
+
+
+def test_stack_histories_matches_prepare_data(history):
+    from lambda_function import DemandForecaster
+
+    sparse = [row for index, row in enumerate(history(40, seed=5)) if index % 3]
+    sparse.append(dict(sparse[-1]))  # A duplicate date
+    histories = {'sparse': sparse, 'late': history(10, start='2025-01-20')}
+
+    stacked = stack_histories(histories)
+    row = stacked.values[stacked.product_ids.index('sparse')]
+    prepared = DemandForecaster().prepare_data(sparse)
+
+    span = ~np.isnan(row)
+    np.testing.assert_allclose(row[span], prepared['y'], rtol=1e-6)  # Gaps are zero demand, duplicates summed
+    assert stacked.observed[0].sum() == len(prepared)
+    late = stacked.values[stacked.product_ids.index('late')]
+    span = (stacked.dates >= np.datetime64('2025-01-20')) & (stacked.dates <= np.datetime64('2025-01-29'))
+    assert np.isnan(late[~span]).all() and not np.isnan(late[span]).any()  # NaN only outside the span
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import boto3
+import pytest
+
+import batch_forecast
+from batch_forecast import VECTORIZED_MODE, BatchForecastProcessor
+
+PAGE_SIZE = 10
+
+
+def catalog(count, inactive_every=0):
+    return [{'product_id': f'p{index}', 'name': f'Product {index}', 'price': 1.0, 'category': 'c',
+             'active': not (inactive_every and index % inactive_every == 0)} for index in range(count)]
+
+
+class StubTable:
+    """Products table double: a parallel scan paginated PAGE_SIZE items at a time, honouring the active filter"""
+
+    def __init__(self, items, fail_segment=None):
+        self.name = 'omnix-products-test'
+        self.items = items
+        self.fail_segment = fail_segment
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def scan(self, Segment, TotalSegments, ExclusiveStartKey=None, **kwargs):
+        with self.lock:
+            self.calls.append((Segment, ExclusiveStartKey))
+        if Segment == self.fail_segment:
+            raise RuntimeError(f'segment {Segment} failed')
+
+        mine = [item for index, item in enumerate(self.items) if index % TotalSegments == Segment]
+        start = ExclusiveStartKey['offset'] if ExclusiveStartKey else 0
+        page = mine[start:start + PAGE_SIZE]
+        response = {'Items': [dict(item) for item in page if item['active']]}
+        if start + PAGE_SIZE < len(mine):
+            response['LastEvaluatedKey'] = {'offset': start + PAGE_SIZE}
+        return response
+
+
+class StubResource:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+    def batch_write_item(self, RequestItems):
+        return {}
+
+
+@pytest.fixture
+def products_table(monkeypatch):
+    """Install a stub products table behind every boto3 entry point the processor uses"""
+    def install(table):
+        resource = StubResource(table)
+        monkeypatch.setattr(boto3, 'resource', lambda *args, **kwargs: resource)
+        monkeypatch.setattr(boto3, 'client', lambda *args, **kwargs: None)
+        monkeypatch.setattr(boto3.session, 'Session', lambda *args, **kwargs: resource_session(resource))
+        return table
+    return install
+
+
+def resource_session(resource):
+    session = type('StubSession', (), {})()
+    session.resource = lambda *args, **kwargs: resource
+    return session
+
+
+def processor(mode=VECTORIZED_MODE):
+    processor = BatchForecastProcessor(mode=mode, group_key='category')
+    processor.initialize_tables()
+    return processor
+
+
+def test_parallel_scan_pages_every_segment_to_the_end(products_table):
+    table = products_table(StubTable(catalog(205, inactive_every=5)))
+
+    products = processor().get_active_products()
+
+    assert sorted(product['product_id'] for product in products) == sorted(
+        item['product_id'] for item in table.items if item['active'])
+    # 205 products over 8 segments: 25 or 26 each, so three pages per segment
+    for segment in range(batch_forecast.PRODUCT_SCAN_SEGMENTS):
+        assert [key for called, key in table.calls if called == segment] == [
+            None, {'offset': PAGE_SIZE}, {'offset': 2 * PAGE_SIZE}]
+
+
+def test_a_failing_segment_raises_instead_of_returning_part_of_the_catalog(products_table):
+    products_table(StubTable(catalog(100), fail_segment=3))
+
+    with pytest.raises(RuntimeError, match='segment 3 failed'):
+        processor().get_active_products()
+
+
+def test_a_failing_scan_fails_the_batch_run(products_table):
+    products_table(StubTable(catalog(100), fail_segment=0))
+
+    result = processor().run_batch_forecast()
+
+    assert result['success'] is False
+    assert 'segment 0 failed' in result['error']
+
+
+def test_scan_waits_for_the_consumer_and_stops_when_closed(products_table):
+    table = products_table(StubTable(catalog(4000)))
+    products = processor().iter_active_products(4)
+
+    for _ in range(15):
+        next(products)
+    time.sleep(0.5)
+    # Each segment can run at most PRODUCT_SCAN_BUFFER pages (plus the one being put) ahead
+    assert len(table.calls) <= 4 * (batch_forecast.PRODUCT_SCAN_BUFFER + 1) + 2
+
+    started = time.monotonic()
+    products.close()
+    assert time.monotonic() - started < 2
+    scanned = len(table.calls)
+    time.sleep(0.3)
+    assert len(table.calls) == scanned
@@ -0,0 +1,77 @@
+import pytest
+
+import lambda_function
+from engines import PROPHET, HoltWintersEngine
+from lambda_function import DemandForecaster, ForecastRequest, StageCostModel
+
+ROWS, HORIZON = 100, 30
+# Uncalibrated costs for 100 rows and 30 days: fit 500ms, holdout accuracy 410ms,
+# sampled predict 184ms, analytic predict 28ms, NumPy engine 10ms
+
+
+@pytest.fixture(autouse=True)
+def fresh_costs(monkeypatch):
+    monkeypatch.setattr(lambda_function, 'stage_costs', StageCostModel())
+
+
+def plan(remaining_ms, interval_mode='sampling', accuracy_mode='holdout', fitted=False, engine=PROPHET):
+    return DemandForecaster().plan_within_budget(remaining_ms, ROWS, HORIZON, 'low', engine,
+                                                 accuracy_mode, interval_mode, fitted)
+
+
+def test_cost_model_priors_and_calibration():
+    costs = StageCostModel()
+
+    assert costs.estimate('fit', ROWS) == 500
+    assert costs.estimate('fit', ROWS, multiplicative=True) == 750
+    assert costs.estimate('predict_analytic', ROWS, multiplicative=True) == 25  # Only fits are slower
+
+    costs.observe('fit', ROWS, 1000)  # Twice the estimate
+    assert costs.estimate('fit', ROWS) == pytest.approx(500 * (0.7 + 0.3 * 2))
+    assert costs.estimate('accuracy', ROWS) == 410
+
+
+@pytest.mark.parametrize('remaining_ms, expected', [
+    (2000, (PROPHET, 'holdout', 'sampling', [])),
+    (1000, (PROPHET, 'holdout', 'analytic', ['intervals'])),
+    (600, (PROPHET, 'cheap', 'analytic', ['intervals', 'accuracy'])),
+    (100, (HoltWintersEngine.name, 'cheap', 'analytic', ['intervals', 'accuracy', 'fit'])),
+])
+def test_degradation_order(remaining_ms, expected):
+    assert plan(remaining_ms) == expected
+
+
+def test_only_requested_stages_are_degraded():
+    assert plan(600, interval_mode='analytic') == (PROPHET, 'cheap', 'analytic', ['accuracy'])
+    assert plan(100, interval_mode='analytic', accuracy_mode='none') == (
+        HoltWintersEngine.name, 'none', 'analytic', ['fit'])
+
+
+def test_fitted_model_is_never_replaced():
+    assert plan(100, fitted=True) == (PROPHET, 'holdout', 'analytic', ['intervals'])
+    assert plan(1, interval_mode='analytic', fitted=True) == (PROPHET, 'holdout', 'analytic', [])
+
+
+def test_engines_degrade_nothing_but_intervals_and_accuracy():
+    assert plan(15, engine=HoltWintersEngine.name) == (HoltWintersEngine.name, 'cheap', 'analytic',
+                                                         ['intervals', 'accuracy'])
+
+
+def test_forecast_reports_degraded_stages(history):
+    request = ForecastRequest('p1', 'Product', history(100), forecast_days=HORIZON, engine=PROPHET,
+                              interval_mode='sampling')
+
+    result = DemandForecaster().generate_forecast(request, budget_ms=1)
+
+    assert result.degraded_stages == ['intervals', 'accuracy', 'fit']
+    assert result.engine == HoltWintersEngine.name
+    assert len(result.forecast_data) == HORIZON
+
+
+def test_forecast_without_budget_is_not_degraded(history):
+    request = ForecastRequest('p1', 'Product', history(60), forecast_days=7, engine=PROPHET, accuracy_mode='none')
+
+    result = DemandForecaster().generate_forecast(request)
+
+    assert result.degraded_stages == []
+    assert result.engine == PROPHET
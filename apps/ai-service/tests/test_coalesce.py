@@ -0,0 +1,83 @@
+import threading
+import time
+
+import numpy as np
+
+from coalesce import SingleFlight, request_key
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def run_together(flight, key, fn, followers=3):
+    """Call fn through `flight` from a leader that blocks until `followers` callers of the same key are waiting"""
+    release = threading.Event()
+    outcomes = []
+    lock = threading.Lock()
+
+    def call():
+        try:
+            outcome = flight.do(key, lambda: (release.wait(5), fn())[1])
+        except Exception as e:
+            outcome = e
+        with lock:
+            outcomes.append(outcome)
+
+    threads = [threading.Thread(target=call) for _ in range(followers + 1)]
+    threads[0].start()
+    wait_for(lambda: flight.in_flight() == 1)
+    for thread in threads[1:]:
+        thread.start()
+    wait_for(lambda: flight.stats()['coalesced'] == followers)
+    release.set()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_leader_and_followers_share_result():
+    flight = SingleFlight()
+    calls = []
+    result = object()
+
+    outcomes = run_together(flight, 'k', lambda: calls.append(1) or result)
+
+    assert len(calls) == 1
+    assert all(value is result for value, _ in outcomes)
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True]
+    assert flight.stats() == {'executed': 1, 'coalesced': 3, 'in_flight': 0}
+
+
+def test_leader_and_followers_share_error():
+    flight = SingleFlight()
+    error = ValueError('fit failed')
+
+    def fail():
+        raise error
+
+    outcomes = run_together(flight, 'k', fail)
+
+    assert len(outcomes) == 4
+    assert all(outcome is error for outcome in outcomes)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_calls_after_completion_run_again():
+    flight = SingleFlight()
+
+    assert flight.do('k', lambda: 1) == (1, False)
+    assert flight.do('k', lambda: 2) == (2, False)
+
+
+def test_request_key_distinguishes_long_arrays():
+    demand = np.zeros(2000)
+    changed = demand.copy()
+    changed[1000] = 1.0
+
+    assert str(demand) == str(changed)
+    assert request_key({'demand': demand}) != request_key({'demand': changed})
+    assert request_key({'demand': demand}) == request_key({'demand': demand.copy()})
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines import (HOLT_WINTERS_MAX_POINTS, PROPHET, SEASONAL_NAIVE_MAX_POINTS, HoltWintersEngine,
+                     SeasonalNaiveEngine, get_engine, register_engine, select_engine)
+
+
+def frame(y, price=None, promotion=None):
+    df = pd.DataFrame({'ds': pd.date_range('2025-01-01', periods=len(y), freq='D'), 'y': np.asarray(y, float)})
+    if price is not None:
+        df['price'] = price
+    if promotion is not None:
+        df['promotion'] = promotion
+    return df
+
+
+def weekly_series(days, slope=0.2, amplitude=10.0, noise=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    return 50 + slope * t + amplitude * np.sin(2 * np.pi * t / 7) + rng.normal(0, noise, days)
+
+
+@pytest.mark.parametrize('points, trend, seasonality, regressors, expected', [
+    (SEASONAL_NAIVE_MAX_POINTS - 1, 'increasing', 'high', True, SeasonalNaiveEngine.name),
+    (SEASONAL_NAIVE_MAX_POINTS, 'increasing', 'high', False, HoltWintersEngine.name),
+    (SEASONAL_NAIVE_MAX_POINTS, 'stable', 'none', True, PROPHET),
+    (HOLT_WINTERS_MAX_POINTS - 1, 'increasing', 'high', False, HoltWintersEngine.name),
+    (HOLT_WINTERS_MAX_POINTS, 'increasing', 'high', False, PROPHET),
+    (HOLT_WINTERS_MAX_POINTS, 'decreasing', 'medium', False, PROPHET),
+    (HOLT_WINTERS_MAX_POINTS, 'stable', 'high', False, HoltWintersEngine.name),
+    (HOLT_WINTERS_MAX_POINTS, 'increasing', 'low', False, HoltWintersEngine.name),
+    (HOLT_WINTERS_MAX_POINTS, 'increasing', 'none', False, HoltWintersEngine.name),
+    (HOLT_WINTERS_MAX_POINTS, 'stable', 'none', True, PROPHET),
+])
+def test_select_engine_thresholds(points, trend, seasonality, regressors, expected):
+    price = np.where(np.arange(points) % 10 < 5, 9.99, 8.99) if regressors else None
+
+    assert select_engine(frame(np.ones(points), price=price), trend, seasonality) == expected
+
+
+def test_constant_regressors_do_not_force_prophet():
+    df = frame(np.ones(30), price=np.full(30, 9.99), promotion=np.zeros(30, dtype=np.int8))
+
+    assert select_engine(df, 'stable', 'none') == HoltWintersEngine.name
+
+
+def test_varying_promotion_forces_prophet():
+    df = frame(np.ones(30), promotion=(np.arange(30) % 7 == 0).astype(np.int8))
+
+    assert select_engine(df, 'stable', 'none') == PROPHET
+
+
+def test_holt_winters_forecasts_trend_and_weekly_cycle():
+    y = weekly_series(112)
+    train, actual = y[:98], y[98:]
+
+    forecast = get_engine(HoltWintersEngine.name, 'increasing', 'high').forecast(frame(train), 14)
+    future = forecast.tail(14)
+
+    mape = np.mean(np.abs(future['yhat'].to_numpy() - actual) / actual)
+    naive_mape = np.mean(np.abs(train[-7:].mean() - actual) / actual)
+    assert mape < 0.05
+    assert mape < naive_mape / 2
+    covered = (actual >= future['yhat_lower'].to_numpy()) & (actual <= future['yhat_upper'].to_numpy())
+    assert covered.mean() >= 0.85
+
+
+def test_holt_winters_frame_shape_and_widening_intervals():
+    df = frame(weekly_series(60))
+
+    forecast = HoltWintersEngine('increasing', 'high').forecast(df, 10)
+
+    assert len(forecast) == 70
+    assert list(forecast.columns) == ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+    assert (np.diff(forecast['ds'].to_numpy()) == np.timedelta64(1, 'D')).all()
+    width = (forecast['yhat_upper'] - forecast['yhat_lower']).to_numpy()
+    assert (width[:60] == 0).all()
+    assert (np.diff(width[60:]) >= 0).all()
+
+
+def test_holt_winters_without_trend_or_season_tracks_the_level():
+    rng = np.random.default_rng(1)
+    y = 20 + rng.normal(0, 1, 60)
+
+    mean = HoltWintersEngine('stable', 'none').forecast(frame(y), 7)['yhat'].to_numpy()[-7:]
+
+    assert np.allclose(mean, mean[0])  # No trend, no seasonal component
+    assert abs(mean[0] - 20) < 1.5
+
+
+def test_seasonal_naive_repeats_last_week():
+    y = np.arange(10, dtype=float)
+
+    forecast = SeasonalNaiveEngine().forecast(frame(y), 9)['yhat'].to_numpy()[-9:]
+
+    np.testing.assert_array_equal(forecast, [3, 4, 5, 6, 7, 8, 9, 3, 4])
+
+
+def test_engines_are_registered_once():
+    assert isinstance(get_engine(HoltWintersEngine.name, 'stable', 'none'), HoltWintersEngine)
+    with pytest.raises(ValueError):
+        register_engine(HoltWintersEngine)
+    with pytest.raises(ValueError):
+        get_engine('no_such_engine', 'stable', 'none')
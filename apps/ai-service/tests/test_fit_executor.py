@@ -0,0 +1,31 @@
+import pytest
+
+from fit_executor import FitExecutor
+from lambda_function import ForecastRequest
+from shadow import shadow_recorder
+
+
+@pytest.fixture
+def shadow_everything(monkeypatch):
+    # Spawned workers read these at import; this process's recorder is configured directly
+    monkeypatch.setenv('SHADOW_ENGINE', 'holt_winters')
+    monkeypatch.setenv('SHADOW_FRACTION', '1')
+    monkeypatch.setattr(shadow_recorder, 'engine', 'holt_winters')
+    monkeypatch.setattr(shadow_recorder, 'fraction', 1.0)
+    shadow_recorder.clear()
+    yield
+    shadow_recorder.clear()
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_shadow_observations_reach_the_callers_recorder(history, shadow_everything, processes):
+    with FitExecutor(1, processes=processes) as executor:
+        if processes and not executor.processes:
+            pytest.skip('process pools are unavailable here')
+        request = ForecastRequest('p1', 'Product', history(60), forecast_days=7, engine='prophet',
+                                  accuracy_mode='none')
+        outcome = executor.submit(request).result(timeout=300)
+
+    assert outcome.result.engine == 'prophet'
+    assert outcome.shadow is not None and outcome.shadow.shadow_engine == 'holt_winters'
+    assert shadow_recorder.stats()['prophet->holt_winters']['runs'] == 1
@@ -0,0 +1,98 @@
+import json
+import time
+
+import pytest
+
+import fit_executor
+import lambda_function
+from fit_executor import FitExecutor
+from lambda_function import BATCH_TIMED_OUT, forecast_batch
+
+
+class Context:
+    function_name = 'forecast'
+    memory_limit_in_mb = 1024
+    invoked_function_arn = 'arn:aws:lambda:us-east-1:123456789012:function:forecast'
+    aws_request_id = 'request-1'
+
+    def __init__(self, remaining_ms=60000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+@pytest.fixture(autouse=True)
+def thread_executor(monkeypatch):
+    executor = FitExecutor(2, processes=False)
+    monkeypatch.setattr(fit_executor, '_shared_executor', executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def item(product_id, rows):
+    return {'product_id': product_id, 'product_name': product_id, 'historical_data': rows, 'forecast_days': 7,
+            'engine': 'holt_winters'}
+
+
+def invoke(requests, context=None):
+    event = {'body': json.dumps({'action': 'forecast_batch', 'data': {'requests': requests}})}
+    response = lambda_function.lambda_handler(event, context or Context())
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_malformed_entries_are_per_item_errors(history):
+    rows = history(30)
+
+    status, body = invoke([item('p1', rows), 'junk', 5, None, item('p2', rows), {'product_id': 'p3'}])
+
+    assert status == 200
+    data = body['data']
+    assert data['total'] == 6
+    assert data['succeeded'] == 2
+    assert [error['product_id'] for error in data['errors']] == [None, None, None, 'p3']
+    assert data['errors'][0]['error'] == 'Each request must be a JSON object'
+    assert {result['product_id'] for result in data['results']} == {'p1', 'p2'}
+
+
+def test_empty_batch_is_rejected():
+    status, body = invoke([])
+
+    assert status != 200
+    assert body['success'] is False
+
+
+@pytest.fixture
+def slow_product(monkeypatch):
+    original = lambda_function.DemandForecaster.generate_forecast
+
+    def generate_forecast(self, request, budget_ms=None):
+        if request.product_id == 'slow':
+            time.sleep(3)
+        return original(self, request, budget_ms)
+
+    monkeypatch.setattr(lambda_function.DemandForecaster, 'generate_forecast', generate_forecast)
+
+
+def test_unfinished_items_time_out_and_finished_ones_are_returned(history, slow_product):
+    rows = history(30)
+    started = time.monotonic()
+
+    results, errors, _ = forecast_batch([item('fast', rows), item('slow', rows), item('queued', rows[:-1])],
+                                        budget_ms=1000)
+
+    assert time.monotonic() - started < 2.5
+    assert [result.product_id for result in results] == ['fast', 'queued']
+    assert errors == [{'product_id': 'slow', 'error': BATCH_TIMED_OUT}]
+
+
+def test_handler_budget_comes_from_the_lambda_context(history, slow_product):
+    rows = history(30)
+    context = Context(remaining_ms=lambda_function.RESPONSE_RESERVE_MS + 800)
+
+    status, body = invoke([item('slow', rows), item('fast', rows)], context)
+
+    assert status == 200
+    assert body['data']['succeeded'] == 1
+    assert body['data']['timed_out'] == 1
+    assert body['data']['errors'] == [{'product_id': 'slow', 'error': BATCH_TIMED_OUT}]
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+import forecast_writer
+from forecast_writer import BATCH_WRITE_LIMIT, BatchForecastWriter
+
+TABLE = 'forecasts'
+
+
+class StubResource:
+    """batch_write_item double: records each call and answers from a list of scripted responses"""
+
+    def __init__(self, responses=None):
+        self.calls = []
+        self.responses = list(responses or [])
+        self.called = threading.Event()
+
+    def batch_write_item(self, RequestItems):
+        self.calls.append([request['PutRequest']['Item'] for request in RequestItems[TABLE]])
+        self.called.set()
+        response = self.responses.pop(0) if self.responses else {}
+        if isinstance(response, Exception):
+            raise response
+        return response(RequestItems) if callable(response) else response
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'BatchWriteItem')
+
+
+def items(count):
+    return [{'product_id': f'p{index}', 'predicted': 1.5} for index in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(forecast_writer, 'BACKOFF_BASE_SECONDS', 0.0)
+
+
+def write(resource, rows, **kwargs):
+    writer = BatchForecastWriter(TABLE, resource=resource, flush_seconds=kwargs.pop('flush_seconds', 60), **kwargs)
+    for row in rows:
+        writer.put(row)
+    return writer.close()
+
+
+def test_unprocessed_items_are_retried():
+    def unprocess_last_two(request_items):
+        return {'UnprocessedItems': {TABLE: request_items[TABLE][-2:]}}
+
+    resource = StubResource([unprocess_last_two])
+    stats = write(resource, items(5))
+
+    assert [len(call) for call in resource.calls] == [5, 2]
+    assert resource.calls[1] == resource.calls[0][-2:]
+    assert stats['written'] == 5
+    assert stats['failed'] == 0
+    assert stats['retried_items'] == 2
+    assert stats['throttled'] == 1
+
+
+def test_throttling_errors_are_retried():
+    resource = StubResource([client_error('ProvisionedThroughputExceededException')])
+    stats = write(resource, items(3))
+
+    assert len(resource.calls) == 2
+    assert stats['written'] == 3
+    assert stats['throttled'] == 1
+
+
+def test_other_errors_give_up_and_count_failed():
+    resource = StubResource([client_error('ValidationException')])
+    stats = write(resource, items(3))
+
+    assert len(resource.calls) == 1
+    assert stats['written'] == 0
+    assert stats['failed'] == 3
+
+
+def test_gives_up_after_max_attempts():
+    resource = StubResource([client_error('ThrottlingException')] * forecast_writer.MAX_ATTEMPTS)
+    stats = write(resource, items(2))
+
+    assert len(resource.calls) == forecast_writer.MAX_ATTEMPTS
+    assert stats['failed'] == 2
+
+
+def test_flushes_full_batches():
+    resource = StubResource()
+    stats = write(resource, items(2 * BATCH_WRITE_LIMIT + 3))
+
+    assert [len(call) for call in resource.calls] == [BATCH_WRITE_LIMIT, BATCH_WRITE_LIMIT, 3]
+    assert stats['written'] == 2 * BATCH_WRITE_LIMIT + 3
+
+
+def test_flushes_after_flush_seconds():
+    resource = StubResource()
+    writer = BatchForecastWriter(TABLE, resource=resource, flush_seconds=0.05)
+    try:
+        started = time.monotonic()
+        for row in items(3):
+            writer.put(row)
+
+        assert resource.called.wait(timeout=5)
+        assert time.monotonic() - started >= 0.05
+        assert [len(call) for call in resource.calls] == [3]
+    finally:
+        writer.close()
+
+
+def test_close_flushes_partial_batch():
+    resource = StubResource()
+    writer = BatchForecastWriter(TABLE, resource=resource, flush_seconds=60)
+    for row in items(3):
+        writer.put(row)
+
+    assert not resource.calls
+    stats = writer.close()
+    assert [len(call) for call in resource.calls] == [3]
+    assert stats['written'] == 3
+    assert stats['requests'] == 1
+
+
+def test_items_are_converted_for_dynamodb():
+    resource = StubResource()
+    write(resource, [{'product_id': 'p', 'predicted': 1.5, 'upper': float('nan'), 'points': [0.25]}])
+
+    item = resource.calls[0][0]
+    assert str(item['predicted']) == '1.5'
+    assert item['upper'] is None
+    assert str(item['points'][0]) == '0.25'
@@ -0,0 +1,76 @@
+import numpy as np
+
+from hierarchy import GroupHistory, aggregate_histories, allocate, disaggregate, forecast_hierarchy
+from lambda_function import DemandForecaster, ForecastRequest
+
+
+def test_reconciled_allocations_sum_to_group_total():
+    rng = np.random.default_rng(7)
+    for products in (1, 2, 7, 40):
+        shares = rng.dirichlet(np.ones(products))
+        total = rng.uniform(0, 500, size=30)
+
+        allocated = allocate(total, shares)
+
+        assert allocated.shape == (products, 30)
+        np.testing.assert_array_equal(allocated.sum(axis=0), np.trunc(total))
+        np.testing.assert_array_equal(allocated, np.round(allocated))
+        assert (allocated >= 0).all()
+
+
+def test_reconciled_allocations_stay_within_one_unit_of_share():
+    shares = np.array([0.5, 0.3, 0.2])
+    total = np.array([10.9, 7.0, 1.0, 0.0])
+
+    allocated = allocate(total, shares)
+
+    assert (np.abs(allocated - shares[:, None] * np.trunc(total)[None, :]) < 1).all()
+    np.testing.assert_array_equal(allocated[:, 1], [4, 2, 1])  # 3.5, 2.1, 1.4: largest remainder wins
+
+
+def test_negative_totals_allocate_nothing():
+    allocated = allocate(np.array([-3.0, 2.0]), np.array([0.6, 0.4]))
+
+    np.testing.assert_array_equal(allocated.sum(axis=0), [0, 2])
+
+
+def test_unreconciled_allocation_is_proportional():
+    shares = np.array([0.25, 0.75])
+    total = np.array([10.5, 3.0])
+
+    np.testing.assert_allclose(allocate(total, shares, reconcile=False), [[2.625, 0.75], [7.875, 2.25]])
+
+
+def group_forecast(forecaster, yhat, yhat_lower, yhat_upper):
+    dates = np.arange('2025-03-01', '2025-03-05', dtype='datetime64[D]')
+    return forecaster.build_result(ForecastRequest('group#c', 'c', [], forecast_days=len(dates)), dates=dates,
+                                   yhat=yhat, yhat_lower=yhat_lower, yhat_upper=yhat_upper, trend='stable',
+                                   seasonality='none', accuracy=80.0, history_length=60, engine='holt_winters')
+
+
+def test_product_intervals_are_shares_of_the_group_bounds():
+    forecaster = DemandForecaster()
+    yhat = np.array([100.0, 80.0, 60.0, 40.0])
+    # Wider than the 0.6-1.0 ratio forecast_data's confidence is clamped to
+    lower = np.array([10.0, 20.0, 50.0, 0.0])
+    upper = np.array([250.0, 150.0, 70.0, 120.0])
+    group = GroupHistory('c', ['a', 'b'], [], np.array([0.75, 0.25]), np.array([60, 60]))
+
+    results = disaggregate(group_forecast(forecaster, yhat, lower, upper), group, {}, forecaster)
+
+    for product_id, share in (('a', 0.75), ('b', 0.25)):
+        np.testing.assert_allclose(results[product_id].yhat_lower, share * lower)
+        np.testing.assert_allclose(results[product_id].yhat_upper, share * upper)
+
+
+def test_hierarchy_product_bounds_add_up_to_the_group_bounds(history):
+    histories = {'a': history(60, seed=1, level=30.0), 'b': history(60, seed=2, level=10.0)}
+    forecaster = DemandForecaster()
+    options = {'engine': 'holt_winters', 'accuracy_mode': 'none'}
+
+    results = forecast_hierarchy(histories, {}, {'c': ['a', 'b']}, horizon=7, forecaster=forecaster, **options)
+    group = forecaster.generate_forecast(ForecastRequest('group#c', 'c', aggregate_histories('c', histories).records,
+                                                         forecast_days=7, **options))
+
+    np.testing.assert_allclose(np.add(results['a'].yhat_lower, results['b'].yhat_lower), group.yhat_lower)
+    np.testing.assert_allclose(np.add(results['a'].yhat_upper, results['b'].yhat_upper), group.yhat_upper)
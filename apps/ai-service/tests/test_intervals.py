@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engines import interval_z
+from lambda_function import DemandForecaster
+
+
+@pytest.fixture
+def forecaster():
+    return DemandForecaster()
+
+
+@pytest.mark.parametrize('interval_width', [0.8, 0.95])
+def test_analytic_width_is_z_sigma(forecaster, interval_width):
+    n, horizon = 50, 10
+    rng = np.random.default_rng(0)
+    y = 20 + rng.normal(0, 3, n)
+    df = pd.DataFrame({'ds': pd.date_range('2025-01-01', periods=n), 'y': y})
+    forecast = pd.DataFrame({'yhat': np.full(n + horizon, 20.0)})
+
+    result = forecaster.add_analytic_intervals(forecast, df, interval_width)
+
+    sigma = np.std(y - 20.0, ddof=1)
+    steps = np.concatenate([np.zeros(n), np.arange(1, horizon + 1)])
+    expected = interval_z(interval_width) * sigma * np.sqrt(1 + steps / n)
+    np.testing.assert_allclose(result['yhat_upper'] - result['yhat'], expected)
+    np.testing.assert_allclose(result['yhat'] - result['yhat_lower'], expected)
+
+
+def test_analytic_width_ignores_missing_residuals(forecaster):
+    df = pd.DataFrame({'ds': pd.date_range('2025-01-01', periods=4), 'y': [1.0, np.nan, 3.0, 5.0]})
+    forecast = pd.DataFrame({'yhat': [2.0, 2.0, 2.0, 2.0, 2.0]})
+
+    result = forecaster.add_analytic_intervals(forecast, df, 0.95)
+
+    sigma = np.std([-1.0, 1.0, 3.0], ddof=1)
+    assert result['yhat_upper'].iloc[0] - 2.0 == pytest.approx(interval_z(0.95) * sigma)
+
+
+def test_prophet_predict_analytic_matches_formula(forecaster, history):
+    df = forecaster.prepare_data(history(60, seed=2))
+    model = forecaster.train_model(df, 'stable', 'high')
+
+    forecast = forecaster.predict(model, df, 14, 'analytic')
+
+    assert model.uncertainty_samples == 0
+    residuals = df['y'].to_numpy(dtype=float) - forecast['yhat'].to_numpy()[:60]
+    spread = (forecast['yhat_upper'] - forecast['yhat']).to_numpy()
+    assert spread[-1] == pytest.approx(interval_z(0.95) * np.std(residuals, ddof=1) * np.sqrt(1 + 14 / 60))
+    assert (np.diff(spread[60:]) > 0).all()
+
+
+def test_prophet_predict_sampling_is_comparable(forecaster, history):
+    df = forecaster.prepare_data(history(60, seed=2))
+    model = forecaster.train_model(df, 'stable', 'high')
+    analytic = forecaster.predict(model, df, 7, 'analytic')
+
+    np.random.seed(0)
+    sampled = forecaster.predict(model, df, 7, 'sampling')
+
+    assert model.uncertainty_samples > 0
+    ratio = ((sampled['yhat_upper'] - sampled['yhat_lower']) / (analytic['yhat_upper'] - analytic['yhat_lower']))
+    assert 0.5 < ratio.iloc[-7:].mean() < 2
+
+
+def test_unknown_interval_mode_is_rejected(forecaster, history):
+    df = forecaster.prepare_data(history(30))
+
+    with pytest.raises(ValueError, match='Unknown interval mode'):
+        forecaster.predict(None, df, 7, 'bootstrap')
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from model_cache import CachedFit, ModelCache, model_cache
+
+
+def entry(size_bytes):
+    return CachedFit(model=None, forecast=pd.DataFrame(), accuracy=90.0, size_bytes=size_bytes)
+
+
+def test_evicts_least_recently_used_over_byte_limit():
+    cache = ModelCache(max_entries=10, max_bytes=300)
+    cache.put('a', entry(100))
+    cache.put('b', entry(100))
+    cache.put('c', entry(100))
+    assert cache.get('a') is not None  # 'b' is now the least recently used
+
+    cache.put('d', entry(100))
+
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in ('a', 'c', 'd'))
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 3
+    assert stats['size_bytes'] == 300
+
+
+def test_large_entry_evicts_several():
+    cache = ModelCache(max_entries=10, max_bytes=300)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, entry(100))
+
+    cache.put('big', entry(250))
+
+    assert len(cache) == 1
+    assert cache.get('big') is not None
+    assert cache.stats()['size_bytes'] == 250
+
+
+def test_entry_over_limit_is_not_cached():
+    cache = ModelCache(max_entries=10, max_bytes=300)
+    cache.put('a', entry(100))
+
+    cache.put('huge', entry(301))
+
+    assert cache.get('huge') is None
+    assert cache.get('a') is not None
+
+
+def test_replacing_key_updates_size():
+    cache = ModelCache(max_entries=10, max_bytes=300)
+    cache.put('a', entry(100))
+    cache.put('a', entry(200))
+
+    assert len(cache) == 1
+    assert cache.stats()['size_bytes'] == 200
+    assert cache.stats()['evictions'] == 0
+
+
+def test_evicts_over_entry_limit():
+    cache = ModelCache(max_entries=2, max_bytes=10_000)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, entry(1))
+
+    assert cache.get('a') is None
+    assert len(cache) == 2
+
+
+def test_cached_accuracy_is_not_served_from_cache(history):
+    from lambda_function import DemandForecaster, ForecastRequest
+
+    rows = history(60)
+    accuracies = []
+    for cached_accuracy in (50.0, 70.0):
+        request = ForecastRequest('p1', 'Product', rows, forecast_days=7, accuracy_mode='cached',
+                                  cached_accuracy=cached_accuracy)
+        accuracies.append(DemandForecaster().generate_forecast(request).accuracy)
+
+    assert accuracies == [50.0, 70.0]
+    assert model_cache.stats()['hits'] == 1
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+import model_store
+from lambda_function import DemandForecaster, ForecastRequest
+from model_store import (BlobModelStore, FilesystemBlobClient, LocalModelStore, ModelStore, StoredModel,
+                         data_watermark)
+
+
+class MemoryBlobClient:
+    def __init__(self):
+        self.blobs = {}
+
+    def put(self, key, data):
+        self.blobs[key] = data
+
+    def get(self, key):
+        return self.blobs.get(key)
+
+
+@pytest.mark.parametrize('product_id', ['../../etc/passwd', '..', '.', 'a/b', '/abs', 'a\\b', '%2E%2E'])
+def test_key_keeps_product_id_in_one_segment(product_id):
+    segment, name = ModelStore.key(product_id, '2025-01-31-abc').split('/')
+
+    assert name == '2025-01-31-abc.json.gz'
+    assert '/' not in segment and '.' not in segment
+    assert segment not in ('', '.', '..')
+
+
+def test_key_distinguishes_escaped_ids():
+    assert ModelStore.key('a/b', 'w') != ModelStore.key('a%2Fb', 'w')
+    assert ModelStore.key('p.1', 'w') != ModelStore.key('p%2E1', 'w')
+
+
+def test_filesystem_client_rejects_keys_outside_root(tmp_path):
+    client = FilesystemBlobClient(str(tmp_path / 'store'))
+
+    for key in ('../outside.json.gz', 'a/../../outside.json.gz'):
+        with pytest.raises(ValueError):
+            client.put(key, b'x')
+        with pytest.raises(ValueError):
+            client.get(key)
+    assert not (tmp_path / 'outside.json.gz').exists()
+
+
+def test_filesystem_client_rejects_symlinks_out_of_root(tmp_path):
+    root = tmp_path / 'store'
+    root.mkdir()
+    (tmp_path / 'elsewhere').mkdir()
+    os.symlink(tmp_path / 'elsewhere', root / 'link')
+
+    with pytest.raises(ValueError):
+        FilesystemBlobClient(str(root)).put('link/model.json.gz', b'x')
+
+
+def test_traversal_product_id_is_stored_inside_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, 'serialize_model', lambda stored: stored.trend.encode())
+    store = BlobModelStore(FilesystemBlobClient(str(tmp_path / 'store')))
+
+    store.save('../../escape', StoredModel(model=None, trend='up', seasonality='none', accuracy=None,
+                                           watermark='w'))
+
+    written = [os.path.join(directory, name) for directory, _, names in os.walk(tmp_path) for name in names]
+    assert len(written) == 1
+    assert written[0].startswith(str(tmp_path / 'store' / 'models') + os.sep)
+
+
+def test_watermark_changes_with_content_and_window(history):
+    forecaster = DemandForecaster()
+    rows = history(60)
+    corrected = [dict(row) for row in rows]
+    corrected[-1]['demand'] += 5
+
+    watermark = data_watermark(forecaster.prepare_data(rows))
+
+    assert watermark.startswith(rows[-1]['date'])
+    assert watermark == data_watermark(forecaster.prepare_data([dict(row) for row in rows]))
+    assert watermark != data_watermark(forecaster.prepare_data(corrected))
+    assert watermark != data_watermark(forecaster.prepare_data(rows[10:]))
+
+
+def test_stored_model_reused_only_for_identical_history(history, tmp_path):
+    from model_cache import model_cache
+
+    store = LocalModelStore(str(tmp_path))
+    rows = history(60)
+    corrected = [dict(row) for row in rows]
+    corrected[-1]['demand'] += 20
+
+    def forecast(data):
+        model_cache.clear()
+        forecaster = DemandForecaster(model_store=store)
+        forecaster.generate_forecast(ForecastRequest('p1', 'Product', data, forecast_days=7,
+                                                     engine='prophet', accuracy_mode='none'))
+        return forecaster.stage_timer.durations
+
+    assert 'fit' in forecast(rows)
+    assert 'fit' not in forecast(rows)  # Same history: predicted from the stored model
+    assert 'fit' in forecast(corrected)  # Same last day, corrected demand: refitted
+
+
+def test_local_store_deletes_oldest_models_over_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, 'serialize_model', lambda stored: b'x' * 100)
+    store = LocalModelStore(str(tmp_path), max_bytes=350)
+
+    for index in range(6):
+        store.save(f'p{index}', StoredModel(model=None, trend='up', seasonality='none', accuracy=None,
+                                            watermark='w'))
+        os.utime(tmp_path / f'p{index}' / 'w.json.gz', (index, index))
+
+    store.evict()
+    remaining = sorted(name for name in os.listdir(tmp_path) if os.listdir(tmp_path / name))
+    assert remaining == ['p3', 'p4', 'p5']
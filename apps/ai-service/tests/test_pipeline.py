@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+import pipeline
+from batch_forecast import BatchForecastProcessor
+from fit_executor import FitExecutor
+from lambda_function import ForecastRequest
+from pipeline import ForecastPipeline
+
+
+class StubProcessor:
+    """The processor calls the pipeline makes, over in-memory histories"""
+
+    def __init__(self, history, short=()):
+        self.history = history
+        self.short = set(short)
+        self.saved = {}
+        self.lock = threading.Lock()
+
+    def fetch_inputs(self, product_id):
+        return (self.history[:3] if product_id in self.short else self.history), {}
+
+    def build_request(self, product, history, profile, previous):
+        if len(history) < 7:
+            return None
+        return ForecastRequest(product['product_id'], product['product_id'], history, forecast_days=7,
+                               engine='holt_winters', accuracy_mode='none')
+
+    def save_forecast(self, product_id, forecast_data):
+        with self.lock:
+            self.saved[product_id] = forecast_data
+        return True
+
+    to_forecast_data = staticmethod(BatchForecastProcessor.to_forecast_data)
+
+
+class Context:
+    """Lambda context whose remaining time drops under any drain threshold after `checks` calls"""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def get_remaining_time_in_millis(self):
+        self.checks -= 1
+        return 15 * 60 * 1000 if self.checks >= 0 else 0
+
+
+class Catalog:
+    """A product source that records whether the pipeline closed it"""
+
+    def __init__(self, count):
+        self.count = count
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed or not self.count:
+            raise StopIteration
+        self.count -= 1
+        return {'product_id': f'p{self.count}'}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def thread_fits(monkeypatch):
+    monkeypatch.setattr(pipeline, 'FitExecutor', lambda workers: FitExecutor(workers, processes=False))
+
+
+def products(count):
+    return [{'product_id': f'p{index}'} for index in range(count)]
+
+
+def test_a_full_run_forecasts_every_product(history):
+    processor = StubProcessor(history(40), short={'p2'})
+
+    summary = ForecastPipeline(processor, Context(10 ** 6), fit_workers=2).run(products(6))
+
+    assert sorted(processor.saved) == ['p0', 'p1', 'p3', 'p4', 'p5']
+    assert summary['processed'] == 5
+    assert summary['failed'] == 1
+    assert summary['skipped'] == 0
+    assert summary['total_products'] == 6
+    assert summary['catalog_complete'] is True
+    assert summary['drained'] is False
+    assert summary['stages']['write']['items'] == 5
+
+
+def test_low_time_drains_in_flight_fits_and_stops_the_scan(history):
+    processor = StubProcessor(history(40))
+    source = Catalog(10000)
+
+    summary = ForecastPipeline(processor, Context(3), fit_workers=2, fetch_depth=8).run(source)
+
+    assert summary['drained'] is True
+    assert summary['catalog_complete'] is False
+    assert source.closed
+    # Fits started before the drain are finished and written; the rest discovered are skipped
+    assert summary['processed'] == len(processor.saved) == 3
+    assert summary['failed'] == 0
+    assert summary['skipped'] == summary['total_products'] - 3
+    assert summary['total_products'] < 10000
+
+
+def test_low_time_after_the_scan_still_reports_the_catalog_complete(history):
+    processor = StubProcessor(history(40))
+
+    summary = ForecastPipeline(processor, Context(2), fit_workers=1).run(products(4))
+
+    assert summary['drained'] is True
+    assert summary['catalog_complete'] is True
+    assert summary['processed'] == 2
+    assert summary['skipped'] == 2
+    assert summary['total_products'] == 4
@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+from lambda_function import DemandForecaster
+
+
+@pytest.fixture
+def forecaster():
+    return DemandForecaster()
+
+
+def test_columnar_and_row_inputs_agree(forecaster, history):
+    rows = history(30, regressors=True)
+    columns = {
+        'dates': [row['date'] for row in rows],
+        'demand': [row['demand'] for row in rows],
+        'price': [row['price'] for row in rows],
+        'promotion': [row['promotion'] for row in rows],
+    }
+
+    columnar = forecaster.prepare_data(columns)
+
+    assert columnar.equals(forecaster.prepare_data(rows))
+    assert list(columnar.columns) == ['ds', 'y', 'price', 'promotion']
+
+
+def test_columnar_dates_as_epoch_days(forecaster):
+    df = forecaster.prepare_data({'dates': [20089, 20090], 'demand': [1, 2]})
+
+    assert [str(day.date()) for day in df['ds']] == ['2025-01-01', '2025-01-02']
+
+
+def test_columnar_missing_optional_columns(forecaster):
+    df = forecaster.prepare_data({'dates': ['2025-01-01', '2025-01-02'], 'demand': [1, 2], 'price': None})
+
+    assert list(df.columns) == ['ds', 'y']
+
+
+@pytest.mark.parametrize('columns', [
+    {'dates': ['2025-01-01', '2025-01-02'], 'demand': [1]},
+    {'dates': ['2025-01-01', '2025-01-02'], 'demand': [1, 2], 'price': [1.0]},
+    {'dates': ['2025-01-01'], 'demand': [1], 'promotion': [0, 1]},
+])
+def test_columnar_mismatched_lengths_are_rejected(forecaster, columns):
+    with pytest.raises(ValueError, match='equal lengths'):
+        forecaster.prepare_data(columns)
+
+
+def test_columnar_missing_demand_is_rejected(forecaster):
+    with pytest.raises(ValueError, match='Invalid historical data format'):
+        forecaster.prepare_data({'dates': ['2025-01-01']})
+
+
+def test_null_promotion_and_price_in_columns(forecaster):
+    df = forecaster.prepare_data({
+        'dates': ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04'],
+        'demand': [1, 2, 3, 4],
+        'price': [None, 9.5, None, 8.0],
+        'promotion': [1, None, 0, None],
+    })
+
+    np.testing.assert_array_equal(df['promotion'], [1, 0, 0, 0])
+    np.testing.assert_array_equal(df['price'], [9.5, 9.5, 9.5, 8.0])  # Nearest known price
+    assert df['promotion'].dtype == np.int8
+
+
+def test_nulls_read_the_same_in_rows_and_columns(forecaster):
+    rows = [
+        {'date': '2025-01-01', 'demand': 1, 'price': 5.0, 'promotion': None},
+        {'date': '2025-01-02', 'demand': 2, 'promotion': 1},
+        {'date': '2025-01-03', 'demand': 3, 'price': None},
+    ]
+    columns = {
+        'dates': ['2025-01-01', '2025-01-02', '2025-01-03'],
+        'demand': [1, 2, 3],
+        'price': [5.0, None, None],
+        'promotion': [None, 1, None],
+    }
+
+    assert forecaster.prepare_data(rows).equals(forecaster.prepare_data(columns))
+
+
+def test_price_column_without_values_is_dropped(forecaster):
+    df = forecaster.prepare_data({'dates': ['2025-01-01', '2025-01-02'], 'demand': [1, 2], 'price': [None, None]})
+
+    assert 'price' not in df.columns
+
+
+def test_forecast_from_columns_with_nulls(forecaster, history):
+    from lambda_function import ForecastRequest
+
+    rows = history(60, regressors=True)
+    columns = {name: [row[key] for row in rows] for name, key in
+               (('dates', 'date'), ('demand', 'demand'), ('price', 'price'), ('promotion', 'promotion'))}
+    columns['price'][::5] = [None] * len(columns['price'][::5])
+    columns['promotion'][::3] = [None] * len(columns['promotion'][::3])
+
+    result = forecaster.generate_forecast(ForecastRequest('p1', 'Product', columns, forecast_days=7,
+                                                          accuracy_mode='none'))
+
+    assert len(result.forecast_data) == 7
+
+
+def test_duplicate_dates_are_merged(forecaster):
+    df = forecaster.prepare_data([
+        {'date': '2025-01-01', 'demand': 3, 'price': 10.0, 'promotion': 0},
+        {'date': '2025-01-02', 'demand': 5, 'price': 10.0, 'promotion': 0},
+        {'date': '2025-01-02', 'demand': 4, 'price': 12.0, 'promotion': 1},
+    ])
+
+    np.testing.assert_array_equal(df['y'], [3, 9])  # Total demand
+    np.testing.assert_array_equal(df['price'], [10.0, 11.0])  # Average price
+    np.testing.assert_array_equal(df['promotion'], [0, 1])  # Any promotion
+
+
+def test_missing_days_are_zero_filled(forecaster):
+    df = forecaster.prepare_data([
+        {'date': '2025-01-01', 'demand': 3, 'price': 10.0, 'promotion': 1},
+        {'date': '2025-01-04', 'demand': 6, 'price': 12.0, 'promotion': 1},
+    ])
+
+    assert [str(day.date()) for day in df['ds']] == ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04']
+    np.testing.assert_array_equal(df['y'], [3, 0, 0, 6])
+    np.testing.assert_array_equal(df['price'], [10.0, 10.0, 10.0, 12.0])  # Previous price
+    np.testing.assert_array_equal(df['promotion'], [1, 0, 0, 1])
+
+
+def test_unsorted_input_is_sorted(forecaster):
+    rows = [
+        {'date': '2025-01-03', 'demand': 3},
+        {'date': '2025-01-01', 'demand': 1},
+        {'date': '2025-01-02', 'demand': 2},
+        {'date': '2025-01-01', 'demand': 1},
+    ]
+
+    df = forecaster.prepare_data(rows)
+
+    assert df['ds'].is_monotonic_increasing
+    np.testing.assert_array_equal(df['y'], [2, 2, 3])
+    assert df.index.tolist() == [0, 1, 2]
+
+
+def test_dtypes_are_compacted(forecaster, history):
+    df = forecaster.prepare_data(history(30, regressors=True)[::2])  # Gaps keep the dtypes too
+
+    assert df['ds'].dtype == 'datetime64[ns]'
+    assert df['y'].dtype == np.float32
+    assert df['price'].dtype == np.float32
+    assert df['promotion'].dtype == np.int8
+
+
+def test_demand_beyond_float32_precision_stays_float64(forecaster):
+    df = forecaster.prepare_data({'dates': ['2025-01-01', '2025-01-02'], 'demand': [2 ** 24 + 1, 1]})
+
+    assert df['y'].dtype == np.float64
+    assert df['y'].iloc[0] == 2 ** 24 + 1